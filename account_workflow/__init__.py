@@ -0,0 +1 @@
+"""Shared processing code for the Payment Tier Automation apps."""
@@ -0,0 +1,51 @@
+"""Compact dtype layout for the final dataset, and the memory it saves."""
+from typing import Dict, List
+
+import pandas as pd
+
+from account_workflow.tiers import TIER_DTYPE
+
+# Final dataset layout; columns not listed keep their dtype. Monetary columns,
+# Amount_per_month included, stay float64: float32 drops cents above ~100k.
+FINAL_DTYPES: Dict[str, object] = {
+    "Tier": TIER_DTYPE,
+    "Workspace": "category",
+    "Phone_Country": "category",
+    "First_Payment": "datetime64[s]",
+    "Last_Payment": "datetime64[s]",
+    "Duration_Months": "int16",
+}
+
+# Turned into categoricals only when values repeat enough to pay for the codes
+MAYBE_CATEGORY_COLUMNS: List[str] = ["Full_Name", "First_Name", "Last_Name"]
+MAX_UNIQUE_RATIO = 0.5
+
+
+def compact_frame(
+    df: pd.DataFrame,
+    dtypes: Dict[str, object] = FINAL_DTYPES,
+    maybe_category: List[str] = MAYBE_CATEGORY_COLUMNS,
+    max_unique_ratio: float = MAX_UNIQUE_RATIO,
+) -> pd.DataFrame:
+    """``df`` with the compact layout applied to the columns it has."""
+    casts = {c: t for c, t in dtypes.items() if c in df.columns}
+    for c in maybe_category:
+        if c in df.columns and len(df) and df[c].nunique(dropna=True) <= max_unique_ratio * len(df):
+            casts[c] = "category"
+    return df.astype(casts)
+
+
+def memory_savings(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column dtype and deep memory (MB) before and after compaction, with a Total row."""
+    before_mb = before.memory_usage(index=False, deep=True) / 2**20
+    after_mb = after.memory_usage(index=False, deep=True) / 2**20
+    table = pd.DataFrame({
+        "Dtype_Before": before.dtypes.astype(str),
+        "Dtype_After": after.dtypes.astype(str),
+        "Before_MB": before_mb,
+        "After_MB": after_mb,
+    })
+    table.loc["Total"] = ["", "", before_mb.sum(), after_mb.sum()]
+    table["Saved_MB"] = table["Before_MB"] - table["After_MB"]
+    table["Saved_%"] = (table["Saved_MB"] / table["Before_MB"] * 100).where(table["Before_MB"] > 0, 0)
+    return table.round(3).rename_axis("Column").reset_index()
@@ -0,0 +1,141 @@
+"""
+Precomputed aggregate cube of the final dataset: customer counts,
+revenue sums and Amount_per_month quantiles for every combination of
+Tier, Workspace, Phone_Country and first-payment cohort month, so
+drill-down queries read a few aggregate rows instead of customer rows.
+"""
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["Tier", "Workspace", "Phone_Country", "Cohort_Month"]
+
+# Measure column -> source column of the final dataset
+REVENUE_SUMS: Dict[str, str] = {
+    "Revenue_All_Time": "A. Payment (all time)",
+    "Revenue_Year": "B. Amount (Year)",
+    "Revenue_Month": "C. Amount (Month)",
+}
+QUANTILES: Dict[str, float] = {"Amount_p25": 0.25, "Amount_p50": 0.5, "Amount_p75": 0.75, "Amount_p90": 0.9}
+MEASURES = ["Customers"] + list(REVENUE_SUMS) + list(QUANTILES)
+
+
+def grouping_id(dims: Sequence[str]) -> int:
+    """Bitmask of the grouped dimensions (bit i set for ``DIMENSIONS[i]``)."""
+    unknown = set(dims) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown cube dimension(s): {', '.join(sorted(unknown))}")
+    return sum(1 << DIMENSIONS.index(d) for d in set(dims))
+
+
+def cube_dimensions(final_merged: pd.DataFrame) -> pd.DataFrame:
+    """The dimension columns, with ``Cohort_Month`` (YYYY-MM of First_Payment) derived, as categoricals."""
+    # format the distinct months only; strftime per row dominates on large outputs
+    months = pd.to_datetime(final_merged["First_Payment"]).to_numpy().astype("datetime64[M]")
+    codes, uniques = pd.factorize(months, sort=True)
+    dims = pd.DataFrame({
+        "Tier": final_merged["Tier"],
+        "Workspace": final_merged["Workspace"],
+        "Phone_Country": final_merged["Phone_Country"],
+        "Cohort_Month": pd.Categorical.from_codes(codes, categories=pd.DatetimeIndex(uniques).strftime("%Y-%m")),
+    }, index=final_merged.index)
+    return dims.astype({d: "category" for d in DIMENSIONS if not isinstance(dims[d].dtype, pd.CategoricalDtype)})
+
+
+def _group_quantiles(codes: np.ndarray, ngroups: int, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    ``QUANTILES`` of ``values`` per group code (linear interpolation, NaN
+    skipped, as ``Series.quantile``). ``values`` must be sorted with NaN
+    last: a stable sort by code then leaves each group's values in order.
+    """
+    order = np.argsort(codes, kind="stable")
+    grouped_values = values[order]
+    sizes = np.bincount(codes, minlength=ngroups)
+    counts = np.bincount(codes[~np.isnan(values)], minlength=ngroups)
+    starts = np.cumsum(sizes) - sizes
+    empty = counts == 0
+    result = {}
+    for name, q in QUANTILES.items():
+        pos = starts + q * np.maximum(counts - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts + np.maximum(counts - 1, 0))
+        if len(grouped_values):
+            lo_value, hi_value = grouped_values[lo.clip(max=len(grouped_values) - 1)], grouped_values[hi.clip(max=len(grouped_values) - 1)]
+            quantile = lo_value + (hi_value - lo_value) * (pos - lo)
+        else:
+            quantile = np.full(ngroups, np.nan)
+        quantile[empty] = np.nan
+        result[name] = quantile
+    return result
+
+
+def _aggregate(frame: pd.DataFrame, dims: List[str]) -> pd.DataFrame:
+    amount = frame["Amount_per_month"].to_numpy()
+    if not dims:
+        row = {"Customers": len(frame), **{m: frame[c].sum() for m, c in REVENUE_SUMS.items()}}
+        row.update({m: v[0] for m, v in _group_quantiles(np.zeros(len(frame), dtype=np.int64), 1, amount).items()})
+        return pd.DataFrame([row])
+    grouped = frame.groupby(dims, observed=True, dropna=False, sort=False)
+    sums = grouped.agg(Customers=("Amount_per_month", "size"), **{m: (c, "sum") for m, c in REVENUE_SUMS.items()})
+    # ngroup numbers the groups in the same order as the aggregated rows
+    quantiles = _group_quantiles(grouped.ngroup().to_numpy(), len(sums), amount)
+    return sums.assign(**quantiles).reset_index()
+
+
+def build_cube(final_merged: pd.DataFrame, dimensions: Sequence[str] = DIMENSIONS) -> pd.DataFrame:
+    """
+    One row per group of every grouping set of ``dimensions`` (all 2^n
+    combinations, including the grand total). ``Grouping`` is the set's
+    ``grouping_id``; dimensions outside the set are NaN, as are groups
+    whose own value is missing (tell them apart by ``Grouping``).
+    """
+    frame = cube_dimensions(final_merged)[list(dimensions)]
+    frame["Amount_per_month"] = final_merged["Amount_per_month"].astype("float64")
+    for column in REVENUE_SUMS.values():
+        frame[column] = final_merged[column]
+    # sorted once by amount, so every grouping set gets its quantiles from one stable sort by group
+    frame = frame.sort_values("Amount_per_month", kind="stable", na_position="last")
+
+    parts = []
+    for size in range(len(dimensions) + 1):
+        for dims in combinations(dimensions, size):
+            part = _aggregate(frame, list(dims))
+            part.insert(0, "Grouping", np.int8(grouping_id(dims)))
+            parts.append(part)
+    cube = pd.concat(parts, ignore_index=True)
+    dtypes = {d: frame[d].dtype for d in dimensions}
+    cube = cube.reindex(columns=["Grouping"] + list(dimensions) + MEASURES).astype(dtypes)
+    return cube.astype({"Customers": "int64"}).round({m: 2 for m in MEASURES if m != "Customers"})
+
+
+def query_cube(
+    cube: pd.DataFrame,
+    by: Sequence[str] = (),
+    filters: Optional[Dict[str, Sequence]] = None,
+) -> pd.DataFrame:
+    """
+    Measures broken down by the dimensions ``by``, restricted to the
+    ``filters`` (dimension -> allowed values), read from the cube's
+    matching grouping set. Filtered dimensions not in ``by`` are summed
+    over for counts and revenue; quantiles need the filter to be a single
+    value (or to be listed in ``by``) and are NaN otherwise.
+    """
+    filters = {d: list(v) for d, v in (filters or {}).items() if v}
+    by = list(by)
+    rows = cube[cube["Grouping"].to_numpy() == grouping_id(by + list(filters))]
+    for d, values in filters.items():
+        rows = rows[rows[d].isin(values)]
+    multi = [d for d, values in filters.items() if d not in by and len(values) > 1]
+    if not multi:
+        return rows[by + MEASURES].reset_index(drop=True)
+    # several values of a dimension not broken down by: add up the additive measures
+    additive = ["Customers"] + list(REVENUE_SUMS)
+    if by:
+        summed = rows.groupby(by, observed=True, dropna=False, sort=False)[additive].sum().reset_index()
+    else:
+        summed = pd.DataFrame([rows[additive].sum()]).astype({"Customers": "int64"})
+    for m in QUANTILES:
+        summed[m] = np.nan
+    return summed[by + MEASURES]
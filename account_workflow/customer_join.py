@@ -0,0 +1,60 @@
+"""Single-pass left joins of several sources onto one email key index."""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Column layout of the final merged dataset
+FINAL_COLUMNS = ['Email', 'Full_Name', 'First_Name', 'Last_Name', 'Phone_Number', 'Phone_Country',
+                 'First_Payment', 'Last_Payment', 'Duration_Months', 'A. Payment (all time)',
+                 'B. Amount (Year)', 'C. Amount (Month)', 'Workspace', 'Amount_per_month', 'Tier']
+
+
+def _first_positions(index: pd.Index, keys: pd.Series) -> np.ndarray:
+    """For every key of ``index``, the row of the first matching ``keys`` entry, or -1."""
+    pos = index.get_indexer(keys)
+    matched = np.flatnonzero(pos >= 0)
+    targets, first = np.unique(pos[matched], return_index=True)
+    take = np.full(len(index), -1, dtype=np.intp)
+    take[targets] = matched[first]
+    return take
+
+
+def _gather(values: pd.Series, take: np.ndarray) -> pd.Series:
+    # missing rows become NA (ints upcast to float, as pd.merge would do)
+    return pd.Series(values.array.take(take, allow_fill=bool((take < 0).any())))
+
+
+def join_on_email(
+    base: pd.DataFrame,
+    sources: Sequence[Tuple[pd.DataFrame, Optional[List[str]]]],
+    columns: Optional[List[str]] = None,
+    key: str = "Email",
+) -> pd.DataFrame:
+    """
+    Equivalent of deduplicating every frame on ``key`` (keeping the first
+    row) and chaining left merges of each source onto ``base``, done as
+    one gather per output column.
+
+    ``sources`` are (frame, source columns or None for all) pairs; a column
+    already provided by ``base`` or an earlier source is not taken again.
+    ``columns`` restricts and orders the output (absent ones are skipped).
+    """
+    base = base[~base[key].duplicated()]
+    index = pd.Index(base[key])
+    wanted = set(columns) if columns is not None else None
+
+    out: Dict[str, pd.Series] = {
+        c: base[c].reset_index(drop=True) for c in base.columns if wanted is None or c in wanted or c == key
+    }
+    for df, source_columns in sources:
+        source_columns = [c for c in (source_columns or df.columns)
+                          if c != key and c not in out and (wanted is None or c in wanted)]
+        if not source_columns:
+            continue
+        take = _first_positions(index, df[key])
+        for c in source_columns:
+            out[c] = _gather(df[c], take)
+
+    order = [c for c in columns if c in out] if columns is not None else list(out)
+    return pd.DataFrame({c: out[c] for c in order})
@@ -0,0 +1,192 @@
+"""On-disk store of fetched Mixpanel events, one Parquet file per event and day."""
+import os
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Days before today that are always re-fetched, for late-arriving events
+HOT_DAYS = 3
+# Partitions older than this many days are removed by evict()
+RETENTION_DAYS = 3 * 365
+# Longest range fetched in one export request. Contiguous missing days are
+# fetched together (the raw export API allows 60 queries/hour per project)
+# and split into day partitions afterwards.
+FETCH_SHARD_DAYS = 7
+
+EPOCH = date(1970, 1, 1)
+
+
+def _slug(event_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", event_name).strip("_")
+
+
+def _stringify_mixed(df: pd.DataFrame) -> pd.DataFrame:
+    """Parquet needs one type per column: turn stray non-string values of object columns into strings."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        values = df[col]
+        mixed = values.notna() & ~values.map(lambda v: isinstance(v, str))
+        if mixed.any() and not mixed.all():
+            df.loc[mixed, col] = values[mixed].astype(str)
+    return df
+
+
+def fetch_ranges(days: List[date], max_days: int = FETCH_SHARD_DAYS) -> List[Tuple[date, date]]:
+    """Sorted ``days`` as runs of consecutive days, each at most ``max_days`` long."""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1) and (day - ranges[-1][0]).days < max_days:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def split_days(df: pd.DataFrame, start: date, end: date) -> List[Tuple[date, pd.DataFrame]]:
+    """
+    Rows of a ``start``..``end`` export, one frame per day (empty days
+    included), by the UTC day of their ``time`` (unix seconds). Rows
+    outside the range, e.g. from a project timezone offset, or without a
+    time go to the nearest day of the range.
+    """
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if "time" in df.columns:
+        day_numbers = pd.to_numeric(df["time"], errors="coerce") // 86_400
+        offsets = (day_numbers - (start - EPOCH).days).fillna(0).clip(0, len(days) - 1).to_numpy(dtype=np.int64)
+    else:
+        offsets = np.zeros(len(df), dtype=np.int64)
+    return [(day, df[offsets == i].reset_index(drop=True)) for i, day in enumerate(days)]
+
+
+class EventStore:
+    """
+    Partitioned cache of Mixpanel exports under ``root/<event>/<YYYY-MM-DD>.parquet``.
+    A partition exists for every day that has been fetched, including days
+    with no events, so only missing days and the hot window are re-fetched.
+    """
+
+    def __init__(self, root, hot_days: int = HOT_DAYS, retention_days: int = RETENTION_DAYS,
+                 max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+
+    def partition_path(self, event_name: str, day: date) -> Path:
+        return self.root / _slug(event_name) / f"{day:%Y-%m-%d}.parquet"
+
+    def stored_days(self, event_name: str) -> List[date]:
+        event_dir = self.root / _slug(event_name)
+        if not event_dir.exists():
+            return []
+        return sorted(date.fromisoformat(p.stem) for p in event_dir.glob("*.parquet"))
+
+    def days_to_fetch(self, event_name: str, from_date: date, to_date: date, today: date = None) -> List[date]:
+        """Days in the range that are not stored yet or fall inside the hot window."""
+        today = today or date.today()
+        hot_from = today - timedelta(days=self.hot_days)
+        stored = set(self.stored_days(event_name))
+        days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+        return [d for d in days if d not in stored or d >= hot_from]
+
+    def write_day(self, event_name: str, day: date, df: pd.DataFrame) -> None:
+        path = self.partition_path(event_name, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        _stringify_mixed(df).to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def iter_days(self, event_name: str, from_date: date, to_date: date,
+                  columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        """Stored non-empty days in the range, one partition at a time."""
+        for d in self.stored_days(event_name):
+            if from_date <= d <= to_date:
+                df = pd.read_parquet(self.partition_path(event_name, d), columns=columns)
+                if len(df):
+                    yield df
+
+    def read_days(self, event_name: str, from_date: date, to_date: date, columns: List[str] = None) -> pd.DataFrame:
+        frames = list(self.iter_days(event_name, from_date, to_date, columns))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def invalidate(self, event_name: str, day: date) -> bool:
+        """Drop a stored day so the next load fetches it again."""
+        path = self.partition_path(event_name, day)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def evict(self, today: date = None) -> int:
+        """
+        Apply the retention policy: remove partitions older than
+        ``retention_days`` and, if ``max_bytes`` is set, the oldest
+        remaining partitions until the store fits. Returns files removed.
+        """
+        today = today or date.today()
+        cutoff = today - timedelta(days=self.retention_days)
+        files = sorted(self.root.glob("*/*.parquet"), key=lambda p: p.stem)
+        removed = 0
+        kept = []
+        for path in files:
+            if date.fromisoformat(path.stem) < cutoff:
+                path.unlink()
+                removed += 1
+            else:
+                kept.append(path)
+        if self.max_bytes is not None:
+            total = sum(p.stat().st_size for p in kept)
+            for path in kept:
+                if total <= self.max_bytes:
+                    break
+                total -= path.stat().st_size
+                path.unlink()
+                removed += 1
+        return removed
+
+    def sync(
+        self,
+        event_name: str,
+        from_date: date,
+        to_date: date,
+        fetch: Callable[[List[Tuple[date, date]]], List[pd.DataFrame]],
+        today: date = None,
+        shard_days: int = FETCH_SHARD_DAYS,
+    ) -> List[date]:
+        """
+        Fetch the missing and hot days of ``from_date``..``to_date`` with
+        ``fetch`` (given date-range shards of consecutive days, at most
+        ``shard_days`` long, returning one frame per shard, e.g.
+        ``mixpanel.fetch_mixpanel_shards``) and store them per day.
+        Returns the fetched days.
+        """
+        days = self.days_to_fetch(event_name, from_date, to_date, today)
+        if days:
+            shards = fetch_ranges(days, shard_days)
+            for (start, end), df in zip(shards, fetch(shards)):
+                for day, part in split_days(df, start, end):
+                    self.write_day(event_name, day, part)
+        return days
+
+    def load(
+        self,
+        event_name: str,
+        from_date: date,
+        to_date: date,
+        fetch: Callable[[List[Tuple[date, date]]], List[pd.DataFrame]],
+        today: date = None,
+        columns: List[str] = None,
+        shard_days: int = FETCH_SHARD_DAYS,
+    ) -> Tuple[pd.DataFrame, List[date]]:
+        """
+        Events for ``from_date``..``to_date``: ``sync`` the range and read it
+        back from disk. Returns the events and the fetched days.
+        """
+        days = self.sync(event_name, from_date, to_date, fetch, today, shard_days)
+        return self.read_days(event_name, from_date, to_date, columns), days
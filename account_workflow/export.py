@@ -0,0 +1,122 @@
+"""
+Exports of the final dataset, written on demand in row chunks: CSV,
+gzip CSV, Parquet, and one file per tier (a directory, or a zip archive
+for downloads).
+"""
+import gzip
+import io
+import os
+import tempfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, Iterator, List
+
+import pandas as pd
+
+# Rows serialized at a time
+EXPORT_ROWS = 100_000
+
+# Format -> MIME type; the format is also the file extension
+EXPORT_FORMATS: Dict[str, str] = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _chunks(df: pd.DataFrame, rows: int) -> Iterator[pd.DataFrame]:
+    # an empty frame still yields one (empty) chunk, so headers and schemas get written
+    for start in range(0, max(len(df), 1), rows):
+        yield df.iloc[start:start + rows]
+
+
+def write_csv(df: pd.DataFrame, f: BinaryIO, rows: int = EXPORT_ROWS):
+    """Same bytes as ``df.to_csv(index=False)`` in UTF-8, serialized ``rows`` at a time."""
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    for i, chunk in enumerate(_chunks(df, rows)):
+        chunk.to_csv(text, index=False, header=i == 0)
+    text.flush()
+    text.detach()
+
+
+def write_gzip_csv(df: pd.DataFrame, f: BinaryIO, rows: int = EXPORT_ROWS):
+    with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+        write_csv(df, gz, rows)
+
+
+def write_parquet(df: pd.DataFrame, f: BinaryIO, rows: int = EXPORT_ROWS):
+    """One row group per ``rows`` rows; categoricals (and the tier order) round-trip."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in _chunks(df, rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+WRITERS: Dict[str, Callable[[pd.DataFrame, BinaryIO, int], None]] = {
+    "csv": write_csv,
+    "csv.gz": write_gzip_csv,
+    "parquet": write_parquet,
+}
+
+
+def export_format(path: str) -> str:
+    """Export format from a file name's extension."""
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if path.lower().endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Unknown export format for {path!r}; use one of {', '.join(EXPORT_FORMATS)}")
+
+
+def write_export(df: pd.DataFrame, f: BinaryIO, fmt: str, rows: int = EXPORT_ROWS):
+    WRITERS[fmt](df, f, rows)
+
+
+def _tier_parts(df: pd.DataFrame) -> Iterator:
+    for tier, part in df.groupby("Tier", observed=True, sort=True):
+        yield str(tier).replace(" ", "_"), part
+
+
+def write_tier_zip(df: pd.DataFrame, f: BinaryIO, fmt: str, stem: str = "final_merged_output",
+                   rows: int = EXPORT_ROWS):
+    """A zip archive with one ``<stem>_<tier>.<fmt>`` file per tier present in ``df``."""
+    # gzip and parquet members are compressed already
+    compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(f, "w", compression=compression) as archive:
+        for tier, part in _tier_parts(df):
+            with archive.open(f"{stem}_{tier}.{fmt}", "w", force_zip64=True) as member:
+                if fmt == "parquet":
+                    # the parquet writer wants a seekable file; tiers are a fraction of the output
+                    buffer = io.BytesIO()
+                    write_parquet(part, buffer, rows)
+                    member.write(buffer.getbuffer())
+                else:
+                    write_export(part, member, fmt, rows)
+
+
+def write_tier_files(df: pd.DataFrame, directory: str, fmt: str, stem: str = "final_merged_output",
+                     rows: int = EXPORT_ROWS) -> List[str]:
+    """One ``<stem>_<tier>.<fmt>`` file per tier under ``directory``; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for tier, part in _tier_parts(df):
+        path = os.path.join(directory, f"{stem}_{tier}.{fmt}")
+        with open(path, "wb") as f:
+            write_export(part, f, fmt, rows)
+        paths.append(path)
+    return paths
+
+
+def export_bytes(df: pd.DataFrame, fmt: str, by_tier: bool = False, stem: str = "final_merged_output") -> bytes:
+    """
+    The export as bytes, for a download. It is serialized chunk by chunk
+    into a temporary file, so only the finished file is ever held in memory.
+    """
+    with tempfile.TemporaryFile() as f:
+        if by_tier:
+            write_tier_zip(df, f, fmt, stem)
+        else:
+            write_export(df, f, fmt)
+        f.seek(0)
+        return f.read()
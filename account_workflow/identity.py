@@ -0,0 +1,98 @@
+"""
+Identity resolution: Mixpanel ids linked to emails through the events
+they share, as connected components of an id graph.
+"""
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from account_workflow.payments import _has_at
+from account_workflow.phones import UNDEFINED_VALUES
+
+# Identity columns linked when both are set on the same event
+IDENTITY_LINKS = [
+    ("distinct_id", "$email"),
+    ("distinct_id", "$distinct_id_before_identity"),
+    ("$distinct_id_before_identity", "$email"),
+]
+
+
+def identity_pairs(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Distinct (a, b) pairs of identity values that appear on the same event.
+    Placeholders such as "undefined" are not identities and are skipped:
+    linking them would join every id they appear with.
+    """
+    frames = []
+    for a, b in IDENTITY_LINKS:
+        if a not in events.columns or b not in events.columns:
+            continue
+        pair = pd.DataFrame({
+            "a": events[a].to_numpy(dtype=object),
+            "b": events[b].to_numpy(dtype=object),
+        }).dropna()
+        real = ~pair["a"].isin(UNDEFINED_VALUES) & ~pair["b"].isin(UNDEFINED_VALUES)
+        frames.append(pair[real & (pair["a"] != pair["b"])])
+    if not frames:
+        return pd.DataFrame({"a": pd.Series(dtype=object), "b": pd.Series(dtype=object)})
+    return pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+
+
+def connected_components(a: np.ndarray, b: np.ndarray, n: int) -> np.ndarray:
+    """
+    Component label (its smallest node) for each of ``n`` nodes, given edges
+    ``a[i]``-``b[i]``. Union-find done an array at a time: each round hooks
+    every root onto the smallest root it shares an edge with, then
+    compresses paths by pointer jumping, until no edge crosses components.
+    Rounds are few in practice, so the work stays near-linear in edges.
+    """
+    parent = np.arange(n)
+    while len(a):
+        ra, rb = parent[a], parent[b]
+        cross = ra != rb
+        if not cross.any():
+            break
+        a, b, ra, rb = a[cross], b[cross], ra[cross], rb[cross]
+        # roots only ever point to smaller nodes, so no cycles can form
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent
+
+
+def build_identity_map(frames: Iterable[pd.DataFrame]) -> pd.Series:
+    """
+    Email for every non-email identity value (distinct_id,
+    $distinct_id_before_identity) linked, through shared events in
+    ``frames``, to exactly one email. Ids linked to several emails (shared
+    devices) or to none are left out. Frames may be chunks of one export;
+    pairs are deduplicated as each one is folded in, so memory follows the
+    distinct pairs rather than the number of chunks.
+    Returns a Series of emails indexed by identity value.
+    """
+    pairs = identity_pairs(pd.DataFrame())
+    for frame in frames:
+        pairs = pd.concat([pairs, identity_pairs(frame)], ignore_index=True).drop_duplicates(ignore_index=True)
+    if pairs.empty:
+        return pd.Series(dtype=object, name="Email", index=pd.Index([], dtype=object, name="identity"))
+
+    codes, uniques = pd.factorize(np.concatenate([pairs["a"].to_numpy(), pairs["b"].to_numpy()]))
+    uniques = np.asarray(uniques, dtype=object)
+    labels = connected_components(codes[:len(pairs)], codes[len(pairs):], len(uniques))
+
+    is_email = _has_at(pd.Series(uniques, dtype=object))
+    email_nodes = np.flatnonzero(is_email)
+    emails_per_component = np.bincount(labels[email_nodes], minlength=len(uniques))
+    component_email = np.full(len(uniques), -1)
+    component_email[labels[email_nodes]] = email_nodes
+
+    keep = ~is_email & (emails_per_component[labels] == 1)
+    return pd.Series(
+        uniques[component_email[labels[keep]]],
+        index=pd.Index(uniques[keep], name="identity"),
+        name="Email",
+    )
@@ -0,0 +1,156 @@
+"""Schema-driven CSV ingestion: column projection, explicit dtypes and header normalization at read time."""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Rows per frame when reading in chunks (the pyarrow engine cannot chunk)
+CHUNK_ROWS = 500_000
+# Values read as missing, as read_csv's defaults
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    label: str
+    columns: Dict[str, object]  # normalized column name -> dtype
+    required: List[str] = field(default_factory=list)
+    normalize: str = "strip"  # "strip" or "title"
+
+    def normalize_header(self, name: str) -> str:
+        name = str(name).strip()
+        return name.title() if self.normalize == "title" else name
+
+
+PIPEDRIVE_CONTACTS = CsvSchema(
+    label="Pipedrive contacts CSV",
+    columns={
+        "Email": str, "Full_Name": str, "First_Name": str, "Last_Name": str,
+        "Phone": str, "Phone_Country_Name": "category",
+    },
+    required=["Email"],
+    normalize="title",
+)
+
+PAYMENT_MIXPANEL = CsvSchema(
+    label="Payment Mixpanel export CSV",
+    columns={
+        "Email": str, "Workspace": "category",
+        "A. Payment (all time)": "float64", "B. Amount (Year)": "float64", "C. Amount (Month)": "float64",
+    },
+    required=["Email"],
+)
+
+PAYMENT_API = CsvSchema(
+    label="Payment API export CSV",
+    columns={"time": "float64", "$email": str, "distinct_id": str, "$distinct_id_before_identity": str},
+    required=["time"],
+)
+
+UNPAID_USER = CsvSchema(
+    label="Unpaid user signup CSV",
+    columns={
+        "$email": str, "Phone Number": str, "Phone Number Country": "category",
+        # optional, used to link ids to emails
+        "distinct_id": str, "$distinct_id_before_identity": str,
+    },
+    required=["$email"],
+)
+
+
+class SchemaError(ValueError):
+    """Input file is missing columns its schema requires."""
+
+
+def _projection(source, schema: CsvSchema) -> Dict[str, str]:
+    """
+    Raw header name -> schema column for the schema's columns present in
+    ``source``. File objects are rewound before and after the header is
+    read, so the same upload can be read more than once.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    raw_by_name = {}
+    for raw in header:
+        raw_by_name.setdefault(schema.normalize_header(raw), raw)
+
+    missing = [c for c in schema.required if c not in raw_by_name]
+    if missing:
+        raise SchemaError(
+            f"{schema.label} is missing required column(s): {', '.join(missing)}. "
+            f"Columns found: {', '.join(map(str, header))}"
+        )
+    return {raw_by_name[name]: name for name in schema.columns if name in raw_by_name}
+
+
+def _conform(df: pd.DataFrame, wanted: Dict[str, str], schema: CsvSchema) -> pd.DataFrame:
+    df = df.rename(columns=wanted)
+    for name, dtype in schema.columns.items():
+        if name not in df.columns:
+            df[name] = pd.Series(index=df.index, dtype=dtype if dtype != str else object)
+    return df[list(schema.columns)]
+
+
+def _read_pyarrow(source, wanted: Dict[str, str], schema: CsvSchema) -> pd.DataFrame:
+    """
+    Read the ``wanted`` columns with pyarrow's CSV reader. Text and
+    category columns are read as strings from the start: ``read_csv``'s
+    pyarrow engine applies ``dtype`` only after inferring types, which
+    turns phone numbers like "07911123456" or "+4477" into floats.
+    """
+    import pyarrow as pa
+    from pyarrow import csv
+
+    text = {raw for raw, name in wanted.items() if schema.columns[name] in (str, "category")}
+    table = csv.read_csv(source, convert_options=csv.ConvertOptions(
+        include_columns=list(wanted),
+        column_types={raw: pa.string() for raw in text},
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+    ))
+    df = table.to_pandas()
+    return df.astype({raw: schema.columns[name] for raw, name in wanted.items() if schema.columns[name] is not str})
+
+
+def read_source(source, schema: CsvSchema) -> pd.DataFrame:
+    """
+    Read only the schema's columns from a CSV path or file object, with
+    explicit dtypes and normalized headers. Optional columns missing from
+    the file are added as empty columns; missing required columns raise
+    SchemaError naming them.
+    """
+    wanted = _projection(source, schema)
+    if CSV_ENGINE == "pyarrow":
+        return _conform(_read_pyarrow(source, wanted, schema), wanted, schema)
+    df = pd.read_csv(
+        source,
+        usecols=list(wanted),
+        dtype={raw: schema.columns[name] for raw, name in wanted.items()},
+    )
+    return _conform(df, wanted, schema)
+
+
+def read_source_chunks(source, schema: CsvSchema, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """``read_source`` in frames of at most ``chunk_rows`` rows, for files too large to hold at once."""
+    wanted = _projection(source, schema)
+    with pd.read_csv(
+        source,
+        usecols=list(wanted),
+        dtype={raw: schema.columns[name] for raw, name in wanted.items()},
+        chunksize=chunk_rows,
+    ) as reader:
+        for chunk in reader:
+            yield _conform(chunk, wanted, schema)
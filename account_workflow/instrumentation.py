@@ -0,0 +1,199 @@
+"""
+Per-stage instrumentation: wall time, memory and row counts for each
+workflow stage, as a table and a JSON run report.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 2**20
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """High-water mark of this process's resident set size."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_rows(value: Any) -> Optional[int]:
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def frame_bytes(value: Any, deep: bool = True) -> Optional[int]:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=deep).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=deep))
+    return None
+
+
+def _mb(n: Optional[int]) -> Optional[float]:
+    return None if n is None else round(n / MB, 2)
+
+
+def _total(values: Iterable[Optional[int]]) -> Optional[int]:
+    values = [v for v in values if v is not None]
+    return sum(values) if values else None
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    seconds: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    memory_in_mb: Optional[float] = None
+    memory_out_mb: Optional[float] = None
+    alloc_peak_mb: Optional[float] = None
+    rss_mb: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+    _inputs: List[Any] = field(default_factory=list, repr=False)
+    _output: Any = field(default=None, repr=False)
+
+    def observe(self, inputs: Iterable[Any] = (), output: Any = None):
+        """Hand the stage's input and output frames over for row and memory counts."""
+        self._inputs = list(inputs)
+        self._output = output
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+
+
+def report_frame(stages: List[dict]) -> pd.DataFrame:
+    """Stage table of a run report's ``stages`` (see ``Instrumentation.to_dict``)."""
+    return pd.DataFrame(stages, columns=list(StageRecord("").to_dict()))
+
+
+class Instrumentation:
+    """
+    Records a StageRecord per stage. Use ``stage(name)`` around any block,
+    or pass the instance as ``run_pipeline``'s ``stage_hook``; ``hook``
+    (e.g. the Streamlit spinner) is entered around every stage.
+
+    Row counts and DataFrame memory are taken after the timer stops, from
+    the frames given to ``StageRecord.observe``. With ``trace_allocations``
+    tracemalloc runs for the whole run (stages must not nest) and each
+    stage reports its peak allocation above what was live before it.
+    """
+
+    def __init__(
+        self,
+        hook: Optional[Callable[[str], ContextManager]] = None,
+        trace_allocations: bool = False,
+        deep_memory: bool = True,
+        run=None,
+    ):
+        self.hook = hook
+        self.trace_allocations = trace_allocations
+        self.deep_memory = deep_memory
+        self.run = run  # StageRun whose cache hits are reported
+        self.records: List[StageRecord] = []
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._owns_tracing = False
+        self.seconds: Optional[float] = None
+        self.report_path: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        record = StageRecord(name)
+        self.records.append(record)
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.seconds = round(time.perf_counter() - start, 4)
+            if tracing:
+                record.alloc_peak_mb = _mb(tracemalloc.get_traced_memory()[1] - before)
+            rss, peak = current_rss_bytes(), peak_rss_bytes()
+            record.rss_mb = _mb(rss)
+            # the two sources account pages slightly differently
+            record.peak_rss_mb = _mb(max(peak, rss or 0) if peak is not None else None)
+            record.rows_in = _total(frame_rows(f) for f in record._inputs)
+            record.rows_out = frame_rows(record._output)
+            record.memory_in_mb = _mb(_total(frame_bytes(f, self.deep_memory) for f in record._inputs))
+            record.memory_out_mb = _mb(frame_bytes(record._output, self.deep_memory))
+            record._inputs, record._output = [], None
+
+    @contextmanager
+    def __call__(self, name: str):
+        with self.hook(name) if self.hook else nullcontext():
+            with self.stage(name) as record:
+                yield record
+
+    def finish(self):
+        """Stop allocation tracing started by this run and fix the total run time (on the first call)."""
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        if self.seconds is None:
+            self.seconds = round(time.perf_counter() - self._start, 4)
+
+    def _with_cache(self) -> List[dict]:
+        rows = [r.to_dict() for r in self.records]
+        if self.run is not None:
+            for row in rows:
+                if row["stage"] in self.run.hits:
+                    row["cache"] = "hit" if self.run.hits[row["stage"]] else "computed"
+        return rows
+
+    def report(self) -> pd.DataFrame:
+        """One row per stage, in execution order."""
+        return report_frame(self._with_cache())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": self.seconds if self.seconds is not None else round(time.perf_counter() - self._start, 4),
+            "peak_rss_mb": _mb(peak_rss_bytes()),
+            "stages": self._with_cache(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def write_report(self, directory: str) -> str:
+        """Write the run report as ``run-<started>.json`` under ``directory``; returns its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run-{self.started:%Y%m%dT%H%M%S}.json")
+        with open(path, "w") as f:
+            f.write(self.to_json())
+        self.report_path = path
+        return path
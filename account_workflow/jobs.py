@@ -0,0 +1,205 @@
+"""
+Background workflow runs: a local worker pool that runs jobs off the
+Streamlit script thread and reports their progress, and an on-disk store
+that keeps every job's status and results by job ID, so a finished run
+can be reopened (by anyone, after a restart) without recomputing it.
+"""
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from account_workflow.pipeline import CACHE_DIR
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+# Concurrent runs; each fetch already runs its own concurrent requests
+JOB_WORKERS = 2
+
+ACTIVE_STATES = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobStore:
+    """
+    One directory per job under ``root/<job_id>``: ``status.json`` (state,
+    parameters, progress events), and once done one Parquet file per
+    result frame plus ``result.json`` for the other values.
+    """
+
+    def __init__(self, root=JOBS_DIR):
+        self.root = Path(root)
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def _write_json(self, path: Path, obj: Any):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(obj, indent=2, default=str))
+        os.replace(tmp, path)
+
+    def write_status(self, status: Dict[str, Any]):
+        self._write_json(self.job_dir(status["id"]) / "status.json", status)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self.job_dir(job_id) / "status.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Every stored job's status, newest first."""
+        if not self.root.exists():
+            return []
+        statuses = [json.loads(p.read_text()) for p in self.root.glob("*/status.json")]
+        return sorted(statuses, key=lambda s: s["submitted"], reverse=True)
+
+    def save_result(self, job_id: str, result: Dict[str, Any]):
+        """Frames go to ``<name>.parquet``; dates and JSON values to ``result.json``."""
+        directory = self.job_dir(job_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        frames, dates, values = [], {}, {}
+        for name, value in result.items():
+            if isinstance(value, pd.DataFrame):
+                tmp = directory / f"{name}.parquet.tmp"
+                value.to_parquet(tmp)
+                os.replace(tmp, directory / f"{name}.parquet")
+                frames.append(name)
+            elif isinstance(value, date):
+                dates[name] = value.isoformat()
+            else:
+                values[name] = value
+        # written last: a job has a result once result.json exists
+        self._write_json(directory / "result.json", {"frames": frames, "dates": dates, "values": values})
+
+    def load_result(self, job_id: str) -> Dict[str, Any]:
+        directory = self.job_dir(job_id)
+        meta = json.loads((directory / "result.json").read_text())
+        result = dict(meta["values"])
+        result.update({name: date.fromisoformat(day) for name, day in meta["dates"].items()})
+        result.update({name: pd.read_parquet(directory / f"{name}.parquet") for name in meta["frames"]})
+        return result
+
+
+class _Job:
+    """A job's status while it is queued or running in this process."""
+
+    def __init__(self, store: JobStore, status: Dict[str, Any]):
+        self.store = store
+        self.status = status
+        self.lock = threading.Lock()
+        # a stage that sends its own "success" event gets no generic "done" one
+        self._reported = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.status, events=list(self.status["events"]))
+
+    def update(self, **fields):
+        with self.lock:
+            self.status.update(fields)
+            self.store.write_status(self.status)
+
+    def notify(self, message: str, kind: str = "note"):
+        """Workflow ``notify`` callback: "status" messages are transient, the rest are kept as events."""
+        with self.lock:
+            if kind == "status":
+                self.status["message"] = message
+                return
+            self.status["events"].append({"kind": kind, "message": message})
+            self._reported = self._reported or kind == "success"
+            self.store.write_status(self.status)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Workflow stage hook: tracks the running stage and records failures."""
+        self._reported = False
+        self.update(stage=name, message=None)
+        try:
+            yield
+        except Exception as e:
+            self.update(error=f"{name} failed: {e}")
+            raise
+        if not self._reported:
+            self.notify(f"{name} done.", "success")
+
+
+class JobRunner:
+    """
+    Runs jobs on a thread pool shared by every session of the app. Jobs
+    run in this process, so they share its stage cache; status and
+    results go through ``store``, so finished jobs can still be opened
+    after the app restarts. Submitting a job identical to one still
+    queued or running (same ``signature``) returns that job instead.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = JOB_WORKERS):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="workflow-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _Job] = {}
+        self._signatures: Dict[str, str] = {}
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args, params: Optional[Dict[str, Any]] = None,
+               signature: Optional[str] = None, **kwargs) -> str:
+        """
+        Queue ``fn(*args, stage_hook=..., notify=..., **kwargs)``, which
+        returns the result dict to persist. ``params`` (JSON values) are
+        stored with the job's status for listing. Returns the job ID.
+        """
+        with self._lock:
+            if signature in self._signatures:
+                return self._signatures[signature]
+            job_id = uuid.uuid4().hex[:12]
+            job = _Job(self.store, {
+                "id": job_id, "state": "queued", "submitted": _now(), "started": None, "finished": None,
+                "params": params or {}, "stage": None, "message": None, "error": None, "events": [],
+            })
+            job.update()
+            self._jobs[job_id] = job
+            if signature is not None:
+                self._signatures[signature] = job_id
+        self._executor.submit(self._run, job, signature, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job: _Job, signature: Optional[str], fn, args, kwargs):
+        job.update(state="running", started=_now())
+        try:
+            result = fn(*args, stage_hook=job.stage, notify=job.notify, **kwargs)
+            self.store.save_result(job.status["id"], result)
+            job.update(state="done", stage=None, message=None, finished=_now())
+        except Exception as e:
+            job.update(state="failed", message=None, finished=_now(), error=job.status["error"] or str(e))
+        finally:
+            with self._lock:
+                self._signatures.pop(signature, None)
+                self._jobs.pop(job.status["id"], None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The job's current status, or None for an unknown ID. A job stored
+        as queued or running that this runner does not know was cut off
+        by a restart and is reported (and stored) as "interrupted".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        status = self.store.status(job_id)
+        if status is not None and status["state"] in ACTIVE_STATES:
+            status.update(state="interrupted", stage=None, message=None)
+            self.store.write_status(status)
+        return status
+
+    def load_result(self, job_id: str) -> Dict[str, Any]:
+        return self.store.load_result(job_id)
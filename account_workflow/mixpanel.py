@@ -0,0 +1,243 @@
+"""Mixpanel raw export client with a streaming NDJSON parser."""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+MIXPANEL_EXPORT_URL = "https://data-eu.mixpanel.com/api/2.0/export"
+
+PAYMENT_EVENT = "New Payment Made"
+UNPAID_SIGNUP_EVENT = "Unpaid Signup User Details"
+
+# Properties the pipeline reads from each exported event
+PAYMENT_PROPERTIES = ["time", "$email", "distinct_id", "$distinct_id_before_identity"]
+UNPAID_SIGNUP_PROPERTIES = [
+    "time", "$email", "distinct_id", "$distinct_id_before_identity", "Phone Number", "Phone Number Country",
+]
+
+# Rows buffered as Python objects before they are turned into a DataFrame chunk
+CHUNK_ROWS = 50_000
+# Bytes read from the response stream at a time (requests' default is 512)
+STREAM_CHUNK_BYTES = 1 << 16
+
+# Sharded fetching. The raw export API allows 60 queries/hour and 3/second
+# per project, so shards default to weeks and the pool stays small.
+QUERIES_PER_HOUR = 60
+SHARD_DAYS = {"day": 1, "week": 7}
+MAX_WORKERS = 3
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class MixpanelExportError(RuntimeError):
+    """Non-200 response from the export endpoint, with its Retry-After in seconds if it sent one."""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+def _records_to_frame(records: List[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(records)
+    # if properties exists, flatten it
+    if "properties" in df.columns:
+        prop = pd.json_normalize(df["properties"])
+        df = pd.concat([df.drop(columns=["properties"]), prop], axis=1)
+    return df
+
+
+def parse_ndjson(lines: Iterable, properties: Optional[List[str]] = None, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse Mixpanel NDJSON export lines (str or bytes) into a DataFrame.
+
+    With ``properties`` set, only 'event' and those properties are kept and
+    rows are collected into per-column buffers of at most ``chunk_rows``
+    values, so memory stays proportional to the projected columns.
+    Without it every property is flattened, as the full export would be.
+    Any iterable of lines works, e.g. an open file or ``Response.iter_lines()``.
+    """
+    columns = ["event"] + list(properties) if properties is not None else None
+    chunks: List[pd.DataFrame] = []
+    buffer: dict = {c: [] for c in columns} if columns else []
+    size = 0
+
+    def flush():
+        nonlocal buffer, size
+        if size:
+            chunks.append(pd.DataFrame(buffer, columns=columns) if columns else _records_to_frame(buffer))
+        buffer = {c: [] for c in columns} if columns else []
+        size = 0
+
+    for line in lines:
+        if not line or not line.strip():
+            continue
+        obj = json.loads(line)
+        if columns:
+            props = obj.get("properties") or {}
+            buffer["event"].append(obj.get("event"))
+            for c in properties:
+                buffer[c].append(props.get(c))
+        else:
+            buffer.append(obj)
+        size += 1
+        if size >= chunk_rows:
+            flush()
+    flush()
+
+    if not chunks:
+        return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def fetch_mixpanel_event(
+    event_name: str,
+    from_date_str: str,
+    to_date_str: str,
+    *,
+    api_key: str,
+    project_id: str,
+    where_expr: str = "",
+    properties: Optional[List[str]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    session: Optional[requests.Session] = None,
+    base_url: str = MIXPANEL_EXPORT_URL,
+    timeout: int = 120,
+) -> pd.DataFrame:
+    """
+    Fetch NDJSON export from Mixpanel for a single event.
+    The response is read incrementally and never held in memory as text.
+    Returns a pandas DataFrame or raises Exception.
+    """
+    params = {
+        "project_id": project_id,
+        "from_date": from_date_str,
+        "to_date": to_date_str,
+        "event": json.dumps([event_name]),
+    }
+    if where_expr:
+        params["where"] = where_expr
+
+    headers = {
+        "accept": "text/plain",
+        "authorization": f"Basic {api_key}",
+    }
+
+    http = session or requests
+    with http.get(base_url, params=params, headers=headers, timeout=timeout, stream=True) as resp:
+        if resp.status_code != 200:
+            raise MixpanelExportError(
+                f"Mixpanel fetch failed for '{event_name}' (status {resp.status_code})", resp.status_code,
+                retry_after=_retry_after(resp),
+            )
+        lines = resp.iter_lines(chunk_size=STREAM_CHUNK_BYTES)
+        return parse_ndjson(lines, properties=properties, chunk_rows=chunk_rows)
+
+
+def date_shards(from_date: date, to_date: date, shard: str = "week") -> List[Tuple[date, date]]:
+    """Split the inclusive ``from_date``..``to_date`` range into consecutive day or week ranges."""
+    step = timedelta(days=SHARD_DAYS[shard])
+    shards = []
+    start = from_date
+    while start <= to_date:
+        end = min(start + step - timedelta(days=1), to_date)
+        shards.append((start, end))
+        start = end + timedelta(days=1)
+    return shards
+
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """Session whose connection pool is shared by all shard workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _fetch_shard(event_name: str, shard: Tuple[date, date], retries: int, backoff: float, **fetch_kwargs) -> pd.DataFrame:
+    """
+    Fetch one shard, retrying rate limits, server errors and dropped
+    connections. Waits as long as the response's Retry-After asks, or
+    with exponential backoff when it gives none.
+    """
+    start, end = shard
+    for attempt in range(retries + 1):
+        wait = backoff * 2 ** attempt
+        try:
+            return fetch_mixpanel_event(
+                event_name, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), **fetch_kwargs
+            )
+        except MixpanelExportError as e:
+            if e.status_code not in RETRY_STATUSES or attempt == retries:
+                raise
+            if e.retry_after is not None:
+                wait = e.retry_after
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            # ChunkedEncodingError: the connection dropped while the export was streaming
+            if attempt == retries:
+                raise
+        time.sleep(wait)
+
+
+def fetch_mixpanel_shards(
+    event_name: str,
+    shards: List[Tuple[date, date]],
+    *,
+    max_workers: int = MAX_WORKERS,
+    retries: int = MAX_RETRIES,
+    backoff: float = BACKOFF_SECONDS,
+    session: Optional[requests.Session] = None,
+    progress: Optional[Callable[[int, int, Tuple[date, date], int], None]] = None,
+    **fetch_kwargs,
+) -> List[pd.DataFrame]:
+    """
+    Fetch ``shards`` concurrently through a bounded worker pool.
+    Returns one DataFrame per shard, in shard order. ``progress(done, total,
+    shard, rows)`` is called from the calling thread as each shard finishes,
+    so it is safe to update Streamlit elements from it.
+    Remaining keyword arguments are passed on to ``fetch_mixpanel_event``.
+    """
+    session = session or make_session(max_workers)
+    frames: List[Optional[pd.DataFrame]] = [None] * len(shards)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_fetch_shard, event_name, shard, retries, backoff, session=session, **fetch_kwargs): i
+            for i, shard in enumerate(shards)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            frames[i] = future.result()
+            if progress:
+                progress(done, len(shards), shards[i], len(frames[i]))
+    return frames
+
+
+def fetch_mixpanel_event_sharded(
+    event_name: str,
+    from_date: date,
+    to_date: date,
+    *,
+    shard: str = "week",
+    **kwargs,
+) -> pd.DataFrame:
+    """Date-sharded, concurrent equivalent of ``fetch_mixpanel_event`` over ``from_date``..``to_date``."""
+    frames = fetch_mixpanel_shards(event_name, date_shards(from_date, to_date, shard), **kwargs)
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=["event"] + list(kwargs["properties"])) if kwargs.get("properties") else pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
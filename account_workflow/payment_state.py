@@ -0,0 +1,104 @@
+"""Persistent per-email payment aggregates, updated incrementally from new events."""
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from account_workflow.payments import (
+    AGGREGATE_COLUMNS,
+    aggregate_payment_dates,
+    merge_payment_dates,
+    payment_event_dates,
+)
+
+STATE_COLUMNS = AGGREGATE_COLUMNS
+# Parquet metadata key of the last day whose events are folded into the state
+SETTLED_KEY = b"settled_through"
+
+
+def empty_state() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Email": pd.Series(dtype=object),
+        "First_Payment": pd.Series(dtype="datetime64[ns]"),
+        "Last_Payment": pd.Series(dtype="datetime64[ns]"),
+        "Event_Count": pd.Series(dtype="int64"),
+    })
+
+
+def load_payment_state(state_dir) -> Tuple[pd.DataFrame, Optional[date]]:
+    """Stored aggregates and the last day whose events are fully folded into them."""
+    import pyarrow.parquet as pq
+
+    state_dir = Path(state_dir)
+    state_path = state_dir / "state.parquet"
+    if not state_path.exists():
+        return empty_state(), None
+    table = pq.read_table(state_path)
+    metadata = table.schema.metadata or {}
+    if SETTLED_KEY in metadata:
+        settled_through = metadata[SETTLED_KEY].decode()
+    else:
+        # written before the watermark moved into the Parquet metadata
+        meta_path = state_dir / "meta.json"
+        if not meta_path.exists():
+            return empty_state(), None
+        settled_through = json.loads(meta_path.read_text())["settled_through"]
+    return table.to_pandas(), date.fromisoformat(settled_through)
+
+
+def save_payment_state(state_dir, state: pd.DataFrame, settled_through: date) -> None:
+    """
+    Write the aggregates with their settled-through day in the Parquet
+    file's metadata, so both are replaced by one atomic rename and a
+    crash can never pair new aggregates with an old watermark.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(state[STATE_COLUMNS], preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, SETTLED_KEY: settled_through.isoformat()})
+    pq.write_table(table, state_dir / "state.parquet.tmp")
+    os.replace(state_dir / "state.parquet.tmp", state_dir / "state.parquet")
+    (state_dir / "meta.json").unlink(missing_ok=True)
+
+
+def update_payment_state(
+    state_dir,
+    payment_api_export: pd.DataFrame,
+    from_date: date,
+    to_date: date,
+    settle_before: date,
+    identity_map: pd.Series = None,
+) -> Tuple[pd.DataFrame, Optional[date]]:
+    """
+    Merge the events fetched for ``from_date``..``to_date`` into the stored state.
+
+    Events on days before ``settle_before`` (i.e. outside the hot window)
+    are folded in permanently and the state is saved; later days are only
+    merged into the returned aggregates, so re-fetched days are never
+    counted twice. Days already settled are skipped. ``identity_map``
+    attributes events without an email, as in ``payment_event_dates``;
+    already settled aggregates are not revisited. If the fetched range
+    leaves a gap after the settled day nothing is persisted.
+    Returns the aggregates for this run and the settled-through day.
+    """
+    state, settled_through = load_payment_state(state_dir)
+    pay = payment_event_dates(payment_api_export, identity_map)
+    if settled_through is not None:
+        pay = pay[pay["Date"] > pd.Timestamp(settled_through)]
+
+    contiguous = settled_through is None or from_date <= settled_through + timedelta(days=1)
+    new_settled = min(to_date, settle_before - timedelta(days=1))
+    if contiguous and (settled_through is None or new_settled > settled_through):
+        settled = pay["Date"] <= pd.Timestamp(new_settled)
+        state = merge_payment_dates(state, aggregate_payment_dates(pay[settled]))
+        save_payment_state(state_dir, state, new_settled)
+        settled_through = new_settled
+        pay = pay[~settled]
+
+    return merge_payment_dates(state, aggregate_payment_dates(pay)), settled_through
@@ -0,0 +1,173 @@
+"""Payment API event processing: email resolution and first/last payment dates."""
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+PAYMENT_EVENT_COLUMNS = ["time", "$email", "distinct_id", "$distinct_id_before_identity"]
+
+# Per-email payment aggregates, as kept in memory and in the payment state
+AGGREGATE_COLUMNS = ["Email", "First_Payment", "Last_Payment", "Event_Count"]
+
+# Order in which identity columns are checked for an email address
+EMAIL_SOURCE_COLUMNS = ["$email", "$distinct_id_before_identity", "distinct_id"]
+
+# Ids looked up in the identity map for events without an email of their own
+IDENTITY_LOOKUP_COLUMNS = ["distinct_id", "$distinct_id_before_identity"]
+
+
+def _has_at(col: pd.Series) -> np.ndarray:
+    """Columnar equivalent of ``"@" in str(value)`` for every value of ``col``."""
+    return col.astype(str).str.contains("@", regex=False, na=False).to_numpy(dtype=bool)
+
+
+def resolve_emails(pay: pd.DataFrame, identity_map: pd.Series = None) -> pd.Series:
+    """
+    Pick the first identity column that looks like an email, per row.
+    Checks '$email', then '$distinct_id_before_identity', then 'distinct_id'.
+    Rows without any '@' value are looked up by id in ``identity_map``
+    (see ``identity.build_identity_map``); the rest resolve to None.
+    """
+    result = np.full(len(pay), None, dtype=object)
+    unresolved = np.ones(len(pay), dtype=bool)
+    for col in EMAIL_SOURCE_COLUMNS:
+        take = unresolved & _has_at(pay[col])
+        result[take] = pay[col].to_numpy(dtype=object)[take]
+        unresolved &= ~take
+    if identity_map is not None and len(identity_map):
+        ids = pd.Index(identity_map.index)
+        emails = identity_map.to_numpy(dtype=object)
+        for col in IDENTITY_LOOKUP_COLUMNS:
+            rows = np.flatnonzero(unresolved)
+            if not len(rows):
+                break
+            pos = ids.get_indexer(pay[col].to_numpy(dtype=object)[rows])
+            found = pos >= 0
+            result[rows[found]] = emails[pos[found]]
+            unresolved[rows[found]] = False
+    return pd.Series(result, index=pay.index, name="email")
+
+
+def email_attribution(events, identity_map: pd.Series) -> pd.DataFrame:
+    """
+    How many payment events carry an email themselves, how many only
+    ``identity_map`` attributes, and how many stay unattributed.
+    ``events`` is one frame or an iterable of chunks.
+    """
+    counts = np.zeros(3, dtype=np.int64)
+    for pay in [events] if isinstance(events, pd.DataFrame) else events:
+        pay = _with_event_columns(pay)
+        direct = resolve_emails(pay).notna().to_numpy()
+        resolved = resolve_emails(pay, identity_map).notna().to_numpy()
+        counts += [direct.sum(), (resolved & ~direct).sum(), (~resolved).sum()]
+    return pd.DataFrame([counts], columns=["With_Email", "Newly_Attributed", "Unattributed"])
+
+
+def months_since_first(first_payment: pd.Series, today: pd.Timestamp = None) -> pd.Series:
+    """
+    Months elapsed between each first payment date and ``today``, rounded up.
+    Missing dates count as 0 months.
+    """
+    if today is None:
+        today = pd.Timestamp.today()
+    dates = pd.to_datetime(first_payment)
+    delta_years = today.year - dates.dt.year.to_numpy(dtype=float)
+    delta_months = today.month - dates.dt.month.to_numpy(dtype=float)
+    delta_days = today.day - dates.dt.day.to_numpy(dtype=float)
+    total_months = delta_years * 12 + delta_months + delta_days / 30
+    months = np.ceil(np.nan_to_num(total_months, nan=0.0))
+    return pd.Series(months.astype(np.int64), index=first_payment.index, name="Duration_Months")
+
+
+def _with_event_columns(payment_api_export: pd.DataFrame) -> pd.DataFrame:
+    pay = payment_api_export.copy()
+    # handle missing columns gracefully
+    for col in PAYMENT_EVENT_COLUMNS:
+        if col not in pay.columns:
+            pay[col] = pd.NA
+    return pay
+
+
+def payment_event_dates(payment_api_export: pd.DataFrame, identity_map: pd.Series = None) -> pd.DataFrame:
+    """Resolved Email and payment Date (midnight timestamp) per event; events without an email are dropped."""
+    pay = _with_event_columns(payment_api_export)
+
+    # convert time if numeric seconds; if time already datetime-ish, let pandas handle
+    try:
+        time = pd.to_datetime(pay["time"], unit="s", errors="coerce")
+    except Exception:
+        time = pd.to_datetime(pay["time"], errors="coerce")
+    pay = pd.DataFrame({"Email": resolve_emails(pay, identity_map), "Date": time.dt.normalize()})
+    return pay.dropna(subset=["Email"])
+
+
+def aggregate_payment_dates(pay: pd.DataFrame) -> pd.DataFrame:
+    """Per-email First_Payment, Last_Payment and Event_Count from ``payment_event_dates`` output."""
+    return pay.groupby("Email")["Date"].agg(
+        First_Payment="min", Last_Payment="max", Event_Count="size"
+    ).reset_index()
+
+
+def merge_payment_dates(state: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold per-email aggregates ``new`` into ``state`` (both AGGREGATE_COLUMNS).
+    Only emails present in ``new`` are looked up and updated, so the work
+    grows with the new data rather than with the stored history.
+    """
+    if new.empty:
+        return state
+    if state.empty:
+        return new[AGGREGATE_COLUMNS].reset_index(drop=True)
+    pos = pd.Index(state["Email"]).get_indexer(new["Email"])
+    known = pos >= 0
+    merged = state.copy()
+    rows = pos[known]
+    first = merged["First_Payment"].to_numpy(copy=True)
+    last = merged["Last_Payment"].to_numpy(copy=True)
+    count = merged["Event_Count"].to_numpy(copy=True)
+    first[rows] = np.fmin(first[rows], new["First_Payment"].to_numpy()[known])
+    last[rows] = np.fmax(last[rows], new["Last_Payment"].to_numpy()[known])
+    count[rows] += new["Event_Count"].to_numpy()[known]
+    merged["First_Payment"], merged["Last_Payment"], merged["Event_Count"] = first, last, count
+    return pd.concat([merged, new.loc[~known, AGGREGATE_COLUMNS]], ignore_index=True)
+
+
+def aggregate_payment_dates_chunked(chunks: Iterable[pd.DataFrame], identity_map: pd.Series = None) -> pd.DataFrame:
+    """
+    ``aggregate_payment_dates`` over raw event frames arriving in chunks
+    (e.g. ``ingest.read_source_chunks`` or ``EventStore.iter_days``).
+    Each chunk is reduced and folded into the running per-email
+    aggregates, so memory grows with the number of emails, not events.
+    """
+    dates = None
+    for chunk in chunks:
+        new = aggregate_payment_dates(payment_event_dates(chunk, identity_map))
+        dates = new if dates is None else merge_payment_dates(dates, new)
+    if dates is None:
+        return aggregate_payment_dates(payment_event_dates(pd.DataFrame(columns=PAYMENT_EVENT_COLUMNS)))
+    # groupby order, as the in-memory aggregation returns it
+    return dates.sort_values("Email", kind="stable", ignore_index=True)
+
+
+def payment_summary(payment_dates: pd.DataFrame, today: pd.Timestamp = None) -> pd.DataFrame:
+    """The pipeline's ``pay1`` layout: Email, First_Payment, Last_Payment (both dates) and Duration_Months."""
+    pay1 = payment_dates[["Email", "First_Payment", "Last_Payment"]].copy()
+    pay1["Duration_Months"] = months_since_first(pay1["First_Payment"], today)
+    return pay1
+
+
+def extract_payment_dates(
+    payment_api_export: pd.DataFrame, today: pd.Timestamp = None, identity_map: pd.Series = None
+) -> pd.DataFrame:
+    """
+    Reduce raw 'New Payment Made' events to one row per email with
+    First_Payment, Last_Payment and Duration_Months.
+    """
+    return payment_summary(aggregate_payment_dates(payment_event_dates(payment_api_export, identity_map)), today)
+
+
+def extract_payment_dates_chunked(
+    chunks: Iterable[pd.DataFrame], today: pd.Timestamp = None, identity_map: pd.Series = None
+) -> pd.DataFrame:
+    """``extract_payment_dates`` with bounded memory, over the export in chunks."""
+    return payment_summary(aggregate_payment_dates_chunked(chunks, identity_map), today)
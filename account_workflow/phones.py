@@ -0,0 +1,113 @@
+"""Phone cleanup: vectorized sentinel/digit normalization and memoized country detection."""
+from functools import lru_cache
+from typing import Optional
+
+import pandas as pd
+
+# Placeholder strings that mean "no value" in Mixpanel and Pipedrive exports
+UNDEFINED_VALUES = ['', ' ', '  ', 'undefined', 'Undefined', 'none', 'None', 'nan', 'NaN']
+
+DEFAULT_REGION = "US"   # used only if a phone has no +country code
+
+PHONE_CACHE_SIZE = 1 << 16
+
+# Mixpanel ('Phone Number', 'Phone Number Country') and Pipedrive ('Phone', 'Phone_Country_Name') fields
+PHONE_SOURCE_COLUMNS = ['Phone Number', 'Phone', 'Phone_Country_Name', 'Phone Number Country']
+
+
+def clean_values(values: pd.Series) -> pd.Series:
+    """Strip whitespace and turn junk/sentinel values into NA."""
+    return values.astype(str).str.strip().replace(UNDEFINED_VALUES, pd.NA)
+
+
+def normalize_phones(values: pd.Series) -> pd.Series:
+    """
+    Vectorized ``normalize_phone``: keep digits and a '+' that comes
+    before the first digit; empty results become NA.
+      '++918521225200' -> '+918521225200'
+      ' +91 8521-225-200 ' -> '+918521225200'
+    """
+    text = clean_values(values)
+    plus = text.str.contains(r"^[^\d]*\+", regex=True, na=False)
+    digits = text.str.replace(r"\D", "", regex=True)
+    normalized = digits.where(~plus, "+" + digits.fillna(""))
+    return normalized.replace("", pd.NA)
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def normalize_phone(raw: str) -> Optional[str]:
+    """
+    Clean obvious junk in a single phone number.
+
+    Examples:
+      '++918521225200' -> '+918521225200'
+      ' +91 8521-225-200 ' -> '+918521225200'
+    """
+    if not raw:
+        return None
+    s = str(raw).strip()
+
+    cleaned_chars = []
+    for ch in s:
+        if ch.isdigit():
+            cleaned_chars.append(ch)
+        elif ch == "+" and not cleaned_chars:
+            cleaned_chars.append(ch)
+
+    return "".join(cleaned_chars) or None
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def detect_country_full_name(phone: str, default_region: str = DEFAULT_REGION) -> Optional[str]:
+    """Return full country name using phonenumbers geocoder; each distinct number is parsed once."""
+    import phonenumbers
+    from phonenumbers import geocoder
+
+    if not phone:
+        return None
+    try:
+        if phone.startswith("+"):
+            num = phonenumbers.parse(phone, None)
+        else:
+            num = phonenumbers.parse(phone, default_region)
+
+        if not phonenumbers.is_valid_number(num):
+            return None
+
+        country_name = geocoder.description_for_number(num, "en")
+        return country_name or None
+    except phonenumbers.NumberParseException:
+        return None
+
+
+def detect_countries(phones: pd.Series, default_region: str = DEFAULT_REGION) -> pd.Series:
+    """Country name per normalized phone, parsing each distinct number only once."""
+    codes, uniques = pd.factorize(phones)
+    if not len(uniques):
+        # every phone is missing: there is nothing to index into
+        return pd.Series(None, index=phones.index, dtype=object)
+    names = pd.Series([detect_country_full_name(p, default_region) for p in uniques], dtype=object)
+    return pd.Series(names.to_numpy()[codes], index=phones.index).where(codes >= 0)
+
+
+def combine_phone_columns(final_merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean the Mixpanel ('Phone Number', 'Phone Number Country') and Pipedrive
+    ('Phone', 'Phone_Country_Name') phone fields and coalesce them into
+    Phone_Number (digit-normalized) and Phone_Country. Numbers with no
+    country in either source get the one detected from the number, when
+    phonenumbers is installed.
+    """
+    # ensure columns exist before operations
+    cleaned = {col: clean_values(final_merged[col]) if col in final_merged.columns
+               else pd.Series(pd.NA, index=final_merged.index, dtype=object)
+               for col in PHONE_SOURCE_COLUMNS}
+    number = normalize_phones(cleaned['Phone Number'].fillna(cleaned['Phone']))
+    country = cleaned['Phone_Country_Name'].fillna(cleaned['Phone Number Country'])
+    undetected = country.isna() & number.notna()
+    if undetected.any():
+        try:
+            country = country.fillna(detect_countries(number[undetected]))
+        except ImportError:
+            pass
+    return final_merged.assign(**cleaned, Phone_Number=number, Phone_Country=country)
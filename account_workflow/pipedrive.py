@@ -0,0 +1,238 @@
+"""Incremental Pipedrive persons sync into a local store, in the Pipedrive contacts CSV layout."""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from account_workflow.phones import detect_country_full_name, normalize_phone
+
+LIMIT = 500
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2.0
+# Shorter normalized numbers are never real phones
+MIN_PHONE_DIGITS = 5
+
+# Columns of the stored persons; all but 'Id' and 'Update_Time' match the Pipedrive contacts CSV
+PERSON_COLUMNS = ["Id", "Email", "Full_Name", "First_Name", "Last_Name", "Phone", "Phone_Country_Name", "Update_Time"]
+CONTACT_COLUMNS = ["Email", "Full_Name", "First_Name", "Last_Name", "Phone", "Phone_Country_Name"]
+
+EMAIL_REGEX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def persons_url(company_domain: str) -> str:
+    return f"https://{company_domain}.pipedrive.com/api/v2/persons"
+
+
+def is_valid_email(value: str) -> bool:
+    if not value:
+        return False
+    value = value.strip()
+    if len(value) < 5 or len(value) > 254:
+        return False
+    return bool(EMAIL_REGEX.match(value))
+
+
+def _pick_value(items, valid: Callable[[str], Optional[str]]) -> Optional[str]:
+    """First valid 'value' of a Pipedrive emails/phones list, preferring the primary entry."""
+    if not isinstance(items, list):
+        return None
+    candidates = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("value"), str):
+            continue
+        value = valid(item["value"].strip())
+        if not value:
+            continue
+        if item.get("primary"):
+            return value
+        candidates.append(value)
+    return candidates[0] if candidates else None
+
+
+def pick_email(person: Dict[str, Any]) -> Optional[str]:
+    """Pick a valid email from person['emails'], preferring primary."""
+    return _pick_value(person.get("emails"), lambda v: v if is_valid_email(v) else None)
+
+
+def valid_phone(value: str) -> Optional[str]:
+    """
+    The normalized phone if it has at least ``MIN_PHONE_DIGITS`` digits and
+    resolves to a country, as the notebook export checks; else None.
+    """
+    phone = normalize_phone(value)
+    if not phone or len(phone.replace("+", "")) < MIN_PHONE_DIGITS:
+        return None
+    try:
+        return phone if detect_country_full_name(phone) else None
+    except ImportError:  # phonenumbers not installed: keep the number unchecked
+        return phone
+
+
+def pick_phone(person: Dict[str, Any]) -> Optional[str]:
+    """Pick a valid phone from person['phones'], preferring a valid primary."""
+    return _pick_value(person.get("phones"), valid_phone)
+
+
+def person_row(person: Dict[str, Any]) -> Dict[str, Any]:
+    phone = pick_phone(person)
+    try:
+        country = detect_country_full_name(phone) if phone else None
+    except ImportError:  # phonenumbers not installed
+        country = None
+    return {
+        "Id": person.get("id"),
+        "Email": pick_email(person),
+        "Full_Name": person.get("name"),
+        "First_Name": person.get("first_name"),
+        "Last_Name": person.get("last_name"),
+        "Phone": phone,
+        "Phone_Country_Name": country,
+        "Update_Time": person.get("update_time"),
+    }
+
+
+def make_session(api_token: str, pool_size: int = 4) -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json", "x-api-token": api_token})
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _rate_limit_wait(resp: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, from Retry-After / x-ratelimit-reset or exponential backoff."""
+    for header in ("Retry-After", "x-ratelimit-reset"):
+        value = resp.headers.get(header)
+        if value:
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                pass
+    return BACKOFF_SECONDS * 2 ** attempt
+
+
+def fetch_person_page(
+    session: requests.Session,
+    url: str,
+    cursor: Optional[str] = None,
+    updated_since: Optional[str] = None,
+    limit: int = LIMIT,
+) -> Dict[str, Any]:
+    """
+    Call Pipedrive v2 persons API for one page. Rate-limited (429) and
+    server error responses are retried, and when the rate-limit headers
+    show the window is used up the call waits for it to reset.
+    """
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if updated_since:
+        params["updated_since"] = updated_since
+        params["sort_by"] = "update_time"
+
+    for attempt in range(MAX_RETRIES + 1):
+        res = session.get(url, params=params, timeout=60)
+        if res.status_code == 429 or res.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                res.raise_for_status()
+            time.sleep(_rate_limit_wait(res, attempt))
+            continue
+        res.raise_for_status()
+        if res.headers.get("x-ratelimit-remaining") == "0":
+            time.sleep(_rate_limit_wait(res, attempt))
+        return res.json()
+
+
+class PersonsStore:
+    """Local persons table (``persons.parquet``) plus the last seen update time (``sync_state.json``)."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @property
+    def persons_path(self) -> Path:
+        return self.root / "persons.parquet"
+
+    @property
+    def state_path(self) -> Path:
+        return self.root / "sync_state.json"
+
+    def load(self) -> pd.DataFrame:
+        if not self.persons_path.exists():
+            return pd.DataFrame(columns=PERSON_COLUMNS)
+        return pd.read_parquet(self.persons_path)
+
+    def last_update_time(self) -> Optional[str]:
+        if not self.state_path.exists():
+            return None
+        return json.loads(self.state_path.read_text()).get("last_update_time")
+
+    def save(self, persons: pd.DataFrame, last_update_time: Optional[str]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.persons_path.with_suffix(".parquet.tmp")
+        persons[PERSON_COLUMNS].to_parquet(tmp, index=False)
+        os.replace(tmp, self.persons_path)
+        self.state_path.write_text(json.dumps({"last_update_time": last_update_time}))
+
+
+def sync_persons(
+    store_dir,
+    api_token: str,
+    company_domain: Optional[str] = None,
+    url: Optional[str] = None,
+    full: bool = False,
+    session: Optional[requests.Session] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Bring the local persons store up to date and return
+    ``{"contacts": DataFrame, "fetched": int, "total": int}``.
+
+    After the first (full) sync only persons updated since the last seen
+    update time are requested and upserted by id. Persons deleted in
+    Pipedrive are only dropped by a ``full`` re-sync.
+    ``progress(page, persons_so_far)`` is called after every page.
+    """
+    store = PersonsStore(store_dir)
+    url = url or persons_url(company_domain)
+    session = session or make_session(api_token)
+    updated_since = None if full else store.last_update_time()
+
+    rows: List[Dict[str, Any]] = []
+    cursor = None
+    page = 1
+    while True:
+        payload = fetch_person_page(session, url, cursor=cursor, updated_since=updated_since)
+        persons = payload.get("data") or []
+        rows.extend(person_row(p) for p in persons)
+        cursor = (payload.get("additional_data") or {}).get("next_cursor")
+        if progress:
+            progress(page, len(rows))
+        page += 1
+        if not persons or not cursor:
+            break
+
+    changed = pd.DataFrame(rows, columns=PERSON_COLUMNS)
+    existing = pd.DataFrame(columns=PERSON_COLUMNS) if full else store.load()
+    if existing.empty:
+        persons = changed.drop_duplicates(subset="Id", keep="last")
+    else:
+        persons = pd.concat([existing[~existing["Id"].isin(changed["Id"])], changed], ignore_index=True)
+        persons = persons.drop_duplicates(subset="Id", keep="last")
+
+    seen = changed["Update_Time"].dropna()
+    last_update_time = max(seen.max(), updated_since or "") if len(seen) else updated_since
+    store.save(persons, last_update_time or None)
+
+    return {
+        "contacts": persons.loc[persons["Email"].notna(), CONTACT_COLUMNS].reset_index(drop=True),
+        "fetched": len(changed),
+        "total": len(persons),
+    }
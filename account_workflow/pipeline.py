@@ -0,0 +1,528 @@
+"""
+Payment tier pipeline: the workflow's stages as plain functions, and a
+headless command line entry point.
+
+    python -m account_workflow.pipeline \
+        --payment-mixpanel payment_mixpanel.csv --pipedrive pipedrive_contacts.csv \
+        --payment-api payment_api.csv --unpaid unpaid_user_signup.csv \
+        --output final_merged_output.csv --summary tier_summary.csv
+
+Without --payment-api/--unpaid the events are fetched from Mixpanel for
+--from-date..--to-date (MIXPANEL_API_KEY / MIXPANEL_PROJECT_ID from the
+environment) through the local event store. With --chunk-rows the payment
+events are reduced chunk by chunk (file chunks or stored days), for
+exports larger than memory. Payments without an email are attributed
+through the Mixpanel ids they share with other events unless
+--no-identity-resolution is given.
+"""
+import argparse
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+from itertools import chain
+from typing import Callable, ContextManager, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from account_workflow.compact import compact_frame, memory_savings
+from account_workflow.cube import build_cube
+from account_workflow.customer_join import FINAL_COLUMNS, join_on_email
+from account_workflow.event_store import EventStore
+from account_workflow.export import export_format, write_export, write_tier_files
+from account_workflow.identity import build_identity_map
+from account_workflow.ingest import (
+    PAYMENT_API,
+    PAYMENT_MIXPANEL,
+    PIPEDRIVE_CONTACTS,
+    UNPAID_USER,
+    read_source,
+    read_source_chunks,
+)
+from account_workflow.instrumentation import Instrumentation
+from account_workflow.mixpanel import (
+    PAYMENT_EVENT,
+    PAYMENT_PROPERTIES,
+    SHARD_DAYS,
+    UNPAID_SIGNUP_EVENT,
+    UNPAID_SIGNUP_PROPERTIES,
+    fetch_mixpanel_event_sharded,
+    fetch_mixpanel_shards,
+    make_session,
+)
+from account_workflow.payments import email_attribution, extract_payment_dates, extract_payment_dates_chunked
+from account_workflow.phones import PHONE_SOURCE_COLUMNS, combine_phone_columns
+from account_workflow.stage_cache import StageRun, content_hash
+from account_workflow.tier_history import TierHistory, delta_summary
+from account_workflow.tiers import (
+    TIER_DTYPE,
+    TIER_RULES,
+    assign_tiers,
+    compare_rule_sets,
+    read_rule_sets,
+    tier_distribution,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = ".cache"
+EVENT_STORE_DIR = os.path.join(CACHE_DIR, "mixpanel_events")
+TIER_HISTORY_DIR = os.path.join(CACHE_DIR, "tier_history")
+
+# Stage name -> description shown while it runs
+STAGES = {
+    "Identity resolution": "Linking Mixpanel ids to emails across payment and signup events",
+    "Identity attribution": "Counting payments attributed through linked ids",
+    "Payment API processing": "Processing Payment API data (extract email/time)",
+    "Payment Mixpanel summary": "Processing Payment Mixpanel file (aggregations)",
+    "Customer join": "Joining payments, Pipedrive contacts and unpaid signups",
+    "Tier assignment": "Calculating Amount_per_month and assigning tiers",
+    "Phone cleanup": "Final phone cleanup",
+    "Compact layout": "Applying the compact column layout",
+    "Tier summary": "Calculating tier summary",
+    "Analytics cube": "Precomputing the tier × workspace × country × cohort cube",
+}
+
+StageHook = Callable[[str], ContextManager]
+
+
+# -------------------------
+# Stages
+# -------------------------
+def summarize_payment_mixpanel(payment_mixpanel_export: pd.DataFrame) -> pd.DataFrame:
+    """Per-email amounts and workspace from the aggregated Payment Mixpanel export."""
+    pay2 = payment_mixpanel_export.copy()
+    # We expect an 'Email' column and amount columns:
+    # 'A. Payment (all time)', 'B. Amount (Year)', 'C. Amount (Month)', 'Workspace'
+    required_cols = ['Email', 'A. Payment (all time)', 'B. Amount (Year)', 'C. Amount (Month)', 'Workspace']
+    for c in required_cols:
+        if c not in pay2.columns:
+            pay2[c] = 0 if "Amount" in c or "Payment" in c else pd.NA
+    return pay2.groupby('Email').agg({
+        'A. Payment (all time)': 'sum',
+        'B. Amount (Year)': 'sum',
+        'C. Amount (Month)': 'sum',
+        'Workspace': 'first'
+    }).reset_index()
+
+
+def prepare_contacts(pipedrive_contacts: pd.DataFrame) -> pd.DataFrame:
+    contacts = pipedrive_contacts.copy()
+    contacts['Email'] = contacts['Email'].str.strip()
+    if 'Phone_Country_Name' in contacts.columns:
+        contacts['Phone_Country_Name'] = contacts['Phone_Country_Name'].str.strip()
+    return contacts
+
+
+def prepare_unpaid_users(unpaid_user: pd.DataFrame) -> pd.DataFrame:
+    # unpaid_user should contain fields like '$email', 'Phone Number', 'Phone Number Country'
+    unpaid = unpaid_user.copy()
+    # adapt column names
+    if '$email' not in unpaid.columns and 'Email' in unpaid.columns:
+        unpaid = unpaid.rename(columns={'Email': '$email'})
+    for col in ['$email', 'Phone Number', 'Phone Number Country']:
+        if col not in unpaid.columns:
+            unpaid[col] = pd.NA
+    return unpaid[['$email', 'Phone Number', 'Phone Number Country']].rename(columns={'$email': 'Email'})
+
+
+def join_customers(pay1, pay2, pipedrive_contacts, unpaid_user) -> pd.DataFrame:
+    # pay2 is the base (right join with pay1), contacts and unpaid users are left-joined
+    return join_on_email(
+        pay2,
+        [(pay1, None), (prepare_contacts(pipedrive_contacts), None), (prepare_unpaid_users(unpaid_user), None)],
+        columns=FINAL_COLUMNS + PHONE_SOURCE_COLUMNS,
+    )
+
+
+def assign_customer_tiers(joined: pd.DataFrame) -> pd.DataFrame:
+    """Add Amount_per_month and Tier; customers without payment events count as 0 months."""
+    pay_merged = joined.copy()
+    pay_merged['Duration_Months'] = pay_merged['Duration_Months'].fillna(0).astype(int)
+    pay_merged['A. Payment (all time)'] = pay_merged['A. Payment (all time)'].fillna(0)
+    pay_merged['Amount_per_month'] = np.where(
+        pay_merged['Duration_Months'] > 0,
+        pay_merged['A. Payment (all time)'] / pay_merged['Duration_Months'],
+        pay_merged['A. Payment (all time)']
+    ).round(2)
+    pay_merged['Tier'] = assign_tiers(pay_merged).astype(TIER_DTYPE)
+    return pay_merged
+
+
+def clean_phones(pay_merged: pd.DataFrame) -> pd.DataFrame:
+    final_merged = combine_phone_columns(pay_merged)
+    # select final columns (if missing columns, create them)
+    for c in FINAL_COLUMNS:
+        if c not in final_merged.columns:
+            final_merged[c] = pd.NA
+    return final_merged[FINAL_COLUMNS]
+
+
+def summarize_tiers(final_merged: pd.DataFrame) -> pd.DataFrame:
+    tiers = final_merged['Tier'].astype(TIER_DTYPE)
+    tier_summary = final_merged.groupby(tiers, observed=True).agg(Number_of_Users=('Email', 'count')).reset_index()
+    tier_summary['Percentage'] = (tier_summary['Number_of_Users'] / tier_summary['Number_of_Users'].sum() * 100).round(2)
+    return tier_summary.sort_values('Tier').reset_index(drop=True)
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+@contextmanager
+def _no_hook(stage: str):
+    yield
+
+
+def run_pipeline(
+    payment_mixpanel_export: pd.DataFrame,
+    pipedrive_contacts: pd.DataFrame,
+    unpaid_user: pd.DataFrame,
+    payment_api_export: Optional[pd.DataFrame] = None,
+    pay1: Optional[pd.DataFrame] = None,
+    *,
+    today: Optional[pd.Timestamp] = None,
+    run: Optional[StageRun] = None,
+    input_keys: Optional[Dict[str, str]] = None,
+    stage_hook: Optional[StageHook] = None,
+    resolve_identities: bool = True,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Run every processing stage and return ``pay1``, ``pay2``,
+    ``final_merged`` (in the compact layout), ``tier_summary``, ``cube``
+    (see ``cube.build_cube``), ``memory_savings`` (what the compact layout saved, per column) and
+    ``attribution`` (``payments.email_attribution`` counts, or None).
+
+    Payment dates come from raw ``payment_api_export`` events, or from a
+    precomputed ``pay1`` (e.g. the incremental payment state). With
+    ``resolve_identities`` events without an email are attributed through
+    the ids they share with other payment and signup events.
+    With ``run`` each stage goes through its stage cache; ``input_keys``
+    may supply cheap keys (upload hashes, stage names) for the input
+    frames, which are otherwise content-hashed.
+    ``stage_hook(name)`` wraps every stage, e.g. to show progress; if it
+    yields a record (see ``instrumentation.Instrumentation``), the stage's
+    input and output frames are passed to its ``observe``.
+    """
+    today = today or pd.Timestamp.today()
+    hook = stage_hook or _no_hook
+    input_keys = dict(input_keys or {})
+
+    def key_of(name: str, df: pd.DataFrame) -> str:
+        if name not in input_keys:
+            input_keys[name] = content_hash(df)
+        return input_keys[name]
+
+    outputs = {}
+
+    def stage(name, inputs, compute, **params):
+        frames = [i[1] if isinstance(i, tuple) else outputs[i] for i in inputs]
+        with hook(name) as record:
+            if run is None:
+                value = compute()
+            else:
+                value = run.run(name, [key_of(*i) if isinstance(i, tuple) else i for i in inputs], compute, **params)
+            if record is not None:
+                record.observe(frames, value)
+        outputs[name] = value
+        return value
+
+    identity_map = attribution = None
+    if pay1 is None:
+        payment_inputs = [("payment_api_export", payment_api_export)]
+        if resolve_identities:
+            identity_map = stage("Identity resolution", payment_inputs + [("unpaid_user", unpaid_user)],
+                                 lambda: build_identity_map([payment_api_export, unpaid_user]))
+            attribution = stage("Identity attribution", payment_inputs + ["Identity resolution"],
+                                lambda: email_attribution(payment_api_export, identity_map))
+            payment_inputs.append("Identity resolution")
+        pay1 = stage("Payment API processing", payment_inputs,
+                     lambda: extract_payment_dates(payment_api_export, today, identity_map), today=str(today.date()))
+        pay1_key = "Payment API processing"
+    else:
+        pay1_key = ("pay1", pay1)
+    pay2 = stage("Payment Mixpanel summary", [("payment_mixpanel_export", payment_mixpanel_export)],
+                 lambda: summarize_payment_mixpanel(payment_mixpanel_export))
+    joined = stage("Customer join",
+                   [pay1_key, "Payment Mixpanel summary", ("pipedrive_contacts", pipedrive_contacts),
+                    ("unpaid_user", unpaid_user)],
+                   lambda: join_customers(pay1, pay2, pipedrive_contacts, unpaid_user))
+    pay_merged = stage("Tier assignment", ["Customer join"], lambda: assign_customer_tiers(joined))
+    cleaned = stage("Phone cleanup", ["Tier assignment"], lambda: clean_phones(pay_merged))
+    final_merged = stage("Compact layout", ["Phone cleanup"], lambda: compact_frame(cleaned))
+    tier_summary = stage("Tier summary", ["Compact layout"], lambda: summarize_tiers(final_merged))
+    cube = stage("Analytics cube", ["Compact layout"], lambda: build_cube(final_merged))
+
+    return {
+        "pay1": pay1,
+        "pay2": pay2,
+        "final_merged": final_merged,
+        "tier_summary": tier_summary,
+        "cube": cube,
+        "memory_savings": memory_savings(cleaned, final_merged),
+        "attribution": attribution,
+    }
+
+
+def reduce_payment_chunks(
+    payment_chunks: Callable[[], Iterable[pd.DataFrame]],
+    unpaid_user: pd.DataFrame,
+    *,
+    today: Optional[pd.Timestamp] = None,
+    run: Optional[StageRun] = None,
+    input_keys: Optional[Dict[str, str]] = None,
+    stage_hook: Optional[StageHook] = None,
+    resolve_identities: bool = True,
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    ``pay1`` and the attribution counts for a payment export too large to
+    load, from the same stages ``run_pipeline`` runs on a loaded one.
+    ``payment_chunks()`` must return a fresh iterator of event frames on
+    every call (e.g. over ``ingest.read_source_chunks``); with
+    ``resolve_identities`` the export is read three times. ``run`` and
+    ``input_keys`` (keys for ``payment_api_export`` and ``unpaid_user``)
+    work as in ``run_pipeline``; without a ``payment_api_export`` key the
+    stages are not cached.
+    """
+    today = today or pd.Timestamp.today()
+    hook = stage_hook or _no_hook
+    input_keys = dict(input_keys or {})
+    if run is not None and "payment_api_export" not in input_keys:
+        run = None
+
+    def stage(name, inputs, compute, **params):
+        with hook(name) as record:
+            if run is None:
+                value = compute()
+            else:
+                if "unpaid_user" in inputs and "unpaid_user" not in input_keys:
+                    input_keys["unpaid_user"] = content_hash(unpaid_user)
+                value = run.run(name, [input_keys.get(i, i) for i in inputs], compute, chunked=True, **params)
+            if record is not None:
+                record.observe([unpaid_user] if "unpaid_user" in inputs else [], value)
+        return value
+
+    identity_map = attribution = None
+    payment_inputs = ["payment_api_export"]
+    if resolve_identities:
+        identity_map = stage("Identity resolution", payment_inputs + ["unpaid_user"],
+                             lambda: build_identity_map(chain(payment_chunks(), [unpaid_user])))
+        attribution = stage("Identity attribution", payment_inputs + ["Identity resolution"],
+                            lambda: email_attribution(payment_chunks(), identity_map))
+        payment_inputs.append("Identity resolution")
+    pay1 = stage("Payment API processing", payment_inputs,
+                 lambda: extract_payment_dates_chunked(payment_chunks(), today, identity_map),
+                 today=str(today.date()))
+    return pay1, attribution
+
+
+def event_fetcher(event_name: str, properties: list, *, max_workers: int = 3, session=None, progress=None,
+                  **fetch_kwargs) -> Callable:
+    """Shards -> frames callable for ``EventStore.load``/``sync``, fetching ``event_name`` concurrently."""
+    session = session or make_session(max_workers)
+    return lambda shards: fetch_mixpanel_shards(
+        event_name, shards, max_workers=max_workers, session=session, progress=progress,
+        properties=properties, **fetch_kwargs,
+    )
+
+
+def fetch_events(
+    event_name: str,
+    properties: list,
+    from_date: date,
+    to_date: date,
+    *,
+    api_key: str,
+    project_id: str,
+    store: Optional[EventStore] = None,
+    shard: str = "week",
+    max_workers: int = 3,
+    session=None,
+    progress=None,
+    today: Optional[date] = None,
+):
+    """
+    Events for ``from_date``..``to_date`` through the local event store
+    (when given) or a direct sharded fetch. Returns the events and the
+    days fetched from Mixpanel (None without a store). ``today`` sets the
+    store's hot window (default: the current date).
+    """
+    fetch_kwargs = dict(
+        max_workers=max_workers, session=session or make_session(max_workers), progress=progress,
+        api_key=api_key, project_id=project_id,
+    )
+    if store is None:
+        return fetch_mixpanel_event_sharded(
+            event_name, from_date, to_date, shard=shard, properties=properties, **fetch_kwargs
+        ), None
+    return store.load(
+        event_name, from_date, to_date,
+        fetch=event_fetcher(event_name, properties, **fetch_kwargs),
+        today=today, columns=["event"] + properties, shard_days=SHARD_DAYS[shard],
+    )
+
+
+# -------------------------
+# Command line
+# -------------------------
+@contextmanager
+def log_stage(stage: str):
+    logger.info("%s...", STAGES.get(stage, stage))
+    yield
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the payment tier workflow without the Streamlit UI.")
+    parser.add_argument("--payment-mixpanel", required=True, help="Payment Mixpanel export CSV (aggregated amounts)")
+    parser.add_argument("--pipedrive", required=True, help="Pipedrive contacts CSV")
+    parser.add_argument("--payment-api", help="Payment API export CSV ('New Payment Made' events)")
+    parser.add_argument("--unpaid", help="Unpaid user signup CSV")
+    parser.add_argument("--from-date", type=date.fromisoformat, help="Mixpanel fetch start (YYYY-MM-DD)")
+    parser.add_argument("--to-date", type=date.fromisoformat, help="Mixpanel fetch end (YYYY-MM-DD)")
+    parser.add_argument("--event-store", default=EVENT_STORE_DIR, help="Local Mixpanel event store directory")
+    parser.add_argument("--chunk-rows", type=int,
+                        help="Reduce the payment events in chunks of this many rows (bounded memory)")
+    parser.add_argument("--no-identity-resolution", action="store_true",
+                        help="Do not attribute email-less payments through linked Mixpanel ids")
+    parser.add_argument("--today", type=pd.Timestamp, help="Reference date for Duration_Months (default: today)")
+    parser.add_argument("--output", required=True,
+                        help="Final merged dataset to write; .csv, .csv.gz or .parquet (by extension)")
+    parser.add_argument("--split-by-tier", metavar="DIR",
+                        help="Also write one file per tier, in the --output format, under DIR")
+    parser.add_argument("--summary", help="Tier summary CSV to write")
+    parser.add_argument("--cube", help="Analytics cube Parquet file to write (query it with cube.query_cube)")
+    parser.add_argument("--tier-history", metavar="DIR", nargs="?", const=TIER_HISTORY_DIR,
+                        help=f"Record this run's tiers in the tier history store (default {TIER_HISTORY_DIR}) "
+                             "and report the changes since the previous snapshot")
+    parser.add_argument("--delta", help="Tier changes since the previous snapshot, as CSV (needs --tier-history)")
+    parser.add_argument("--compare-tier-rules", metavar="RULES_JSON",
+                        help="Candidate tier rule sets ({name: [[tier, min_duration, comparison, threshold], ...]}) "
+                             "to score against the current rules; logs the customers per tier for each")
+    parser.add_argument("--report", help="JSON run report (per-stage time, memory and rows) to write")
+    parser.add_argument("--trace-memory", action="store_true", help="Trace per-stage peak allocations (slower)")
+    return parser
+
+
+def load_inputs(args, instrumentation: Instrumentation) -> Tuple[Dict[str, pd.DataFrame], Optional[pd.DataFrame]]:
+    """Pipeline inputs from the command line sources, and the attribution counts if pay1 was reduced here."""
+    def read(path, schema):
+        with instrumentation(f"Read {schema.label}") as record:
+            df = read_source(path, schema)
+            record.observe(output=df)
+        return df
+
+    inputs = {
+        "payment_mixpanel_export": read(args.payment_mixpanel, PAYMENT_MIXPANEL),
+        "pipedrive_contacts": read(args.pipedrive, PIPEDRIVE_CONTACTS),
+    }
+    needs_fetch = args.payment_api is None or args.unpaid is None
+    if needs_fetch and (args.from_date is None or args.to_date is None):
+        raise SystemExit("--from-date and --to-date are required when --payment-api or --unpaid is not given")
+
+    store = EventStore(args.event_store)
+    today = args.today.date() if args.today is not None else None
+    credentials = {}
+    if needs_fetch:
+        credentials = dict(api_key=os.environ["MIXPANEL_API_KEY"], project_id=os.environ["MIXPANEL_PROJECT_ID"])
+
+    for name, path, schema, event, properties in [
+        ("unpaid_user", args.unpaid, UNPAID_USER, UNPAID_SIGNUP_EVENT, UNPAID_SIGNUP_PROPERTIES),
+        ("payment_api_export", args.payment_api, PAYMENT_API, PAYMENT_EVENT, PAYMENT_PROPERTIES),
+    ]:
+        if name == "payment_api_export" and args.chunk_rows:
+            break
+        if path is not None:
+            inputs[name] = read(path, schema)
+            continue
+        with instrumentation(f"Fetch {event}") as record:
+            inputs[name], fetched = fetch_events(
+                event, properties, args.from_date, args.to_date, store=store, today=today, **credentials
+            )
+            record.observe(output=inputs[name])
+        logger.info("Fetched %d day(s) of '%s' from Mixpanel, %d rows total", len(fetched), event, len(inputs[name]))
+
+    if not args.chunk_rows:
+        return inputs, None
+
+    # Payment events are reduced to pay1 chunk by chunk and never held whole
+    if args.payment_api is not None:
+        def payment_chunks():
+            return read_source_chunks(args.payment_api, PAYMENT_API, args.chunk_rows)
+    else:
+        with instrumentation(f"Fetch {PAYMENT_EVENT}"):
+            fetched = store.sync(PAYMENT_EVENT, args.from_date, args.to_date,
+                                 fetch=event_fetcher(PAYMENT_EVENT, PAYMENT_PROPERTIES, **credentials), today=today)
+        logger.info("Fetched %d day(s) of '%s' from Mixpanel", len(fetched), PAYMENT_EVENT)
+
+        def payment_chunks():
+            return store.iter_days(PAYMENT_EVENT, args.from_date, args.to_date, ["event"] + PAYMENT_PROPERTIES)
+
+    inputs["pay1"], attribution = reduce_payment_chunks(
+        payment_chunks, inputs["unpaid_user"], today=args.today, stage_hook=instrumentation,
+        resolve_identities=not args.no_identity_resolution,
+    )
+    return inputs, attribution
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        export_format(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.delta and not args.tier_history:
+        parser.error("--delta needs --tier-history")
+    rule_sets = {}
+    if args.compare_tier_rules:
+        try:
+            rule_sets = read_rule_sets(args.compare_tier_rules)
+        except (OSError, ValueError) as e:
+            parser.error(f"--compare-tier-rules: {e}")
+
+    instrumentation = Instrumentation(hook=log_stage, trace_allocations=args.trace_memory)
+    inputs, attribution = load_inputs(args, instrumentation)
+    result = run_pipeline(**inputs, today=args.today, stage_hook=instrumentation,
+                          resolve_identities=not args.no_identity_resolution)
+    instrumentation.finish()
+    attribution = result["attribution"] if attribution is None else attribution
+
+    with open(args.output, "wb") as f:
+        write_export(result["final_merged"], f, export_format(args.output))
+    logger.info("Wrote %d customers to %s", len(result["final_merged"]), args.output)
+    if args.split_by_tier:
+        stem = os.path.basename(args.output)[:-len(export_format(args.output)) - 1]
+        paths = write_tier_files(result["final_merged"], args.split_by_tier, export_format(args.output), stem)
+        logger.info("Wrote %d tier file(s) to %s", len(paths), args.split_by_tier)
+    if args.summary:
+        result["tier_summary"].to_csv(args.summary, index=False)
+    if args.cube:
+        result["cube"].to_parquet(args.cube, index=False)
+    logger.info("Tier summary:\n%s", result["tier_summary"].to_string(index=False))
+    if args.tier_history:
+        day = (args.today or pd.Timestamp.today()).date()
+        previous_day, delta = TierHistory(args.tier_history).record_run(result["final_merged"], day)
+        if delta is None:
+            logger.info("Recorded the first tier snapshot (%s) in %s", day, args.tier_history)
+        else:
+            logger.info("Tier changes since %s:\n%s", previous_day, delta_summary(delta).to_string(index=False))
+            if args.delta:
+                delta.to_csv(args.delta, index=False)
+    if rule_sets:
+        scored = compare_rule_sets(result["final_merged"], {"current": TIER_RULES, **rule_sets})
+        logger.info("Customers per tier by rule set:\n%s", tier_distribution(scored).to_string())
+    if attribution is not None:
+        logger.info("Payment attribution:\n%s", attribution.to_string(index=False))
+    total = result["memory_savings"].set_index("Column").loc["Total"]
+    logger.info("Compact layout: %.2f MB, %.2f MB (%.0f%%) saved", total["After_MB"], total["Saved_MB"], total["Saved_%"])
+    logger.info("Stages:\n%s", instrumentation.report().drop(columns=["cache", "error"]).to_string(index=False))
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(instrumentation.to_json())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""In-memory memoization of pipeline stages keyed on content hashes of their inputs."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+# Default budget for cached stage outputs
+MAX_BYTES = 1024 ** 3
+
+
+def content_hash(obj) -> str:
+    """
+    Stable hash of a stage input: raw bytes, an uploaded/opened file
+    (hashed from its bytes, position restored), a DataFrame (hashed by
+    values, index and column names) or any value with a stable repr.
+    """
+    h = hashlib.sha256()
+    if isinstance(obj, (bytes, bytearray)):
+        h.update(obj)
+    elif isinstance(obj, pd.DataFrame):
+        h.update(repr(list(obj.columns)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif hasattr(obj, "getvalue"):
+        h.update(obj.getvalue())
+    elif hasattr(obj, "read"):
+        pos = obj.tell()
+        for block in iter(lambda: obj.read(1 << 20), b""):
+            h.update(block)
+        obj.seek(pos)
+    else:
+        h.update(repr(obj).encode())
+    return h.hexdigest()
+
+
+def _size_of(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, tuple):
+        return sum(_size_of(v) for v in value)
+    return 0
+
+
+class StageCache:
+    """
+    LRU cache of stage outputs bounded by their in-memory size.
+    Keys combine the stage name with hashes of its inputs and parameters.
+    Cached values are shared between runs: stages must not modify their
+    inputs or a value after returning it.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(stage: str, *inputs: str, **params) -> str:
+        """Cache key from a stage name, input keys/hashes and stage parameters."""
+        parts = [stage, *inputs, repr(sorted(params.items()))]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Cached value for ``key`` (computing and storing it on a miss) and whether it was a hit."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0], True
+        value = compute()
+        size = _size_of(value)
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return value, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class StageRun:
+    """Runs stages of one workflow execution through a StageCache, recording which were cache hits."""
+
+    def __init__(self, cache: StageCache):
+        self.cache = cache
+        self.hits: Dict[str, bool] = {}
+        self.keys: Dict[str, str] = {}
+
+    def run(self, stage: str, inputs: List[str], compute: Callable[[], Any], **params):
+        """
+        Run ``stage`` unless an identical run is cached. ``inputs`` are
+        content hashes or names of earlier stages of this run, whose keys
+        are chained in. Returns the stage output.
+        """
+        upstream = [self.keys.get(i, i) for i in inputs]
+        key = StageCache.key(stage, *upstream, **params)
+        value, hit = self.cache.get_or_compute(key, compute)
+        self.keys[stage] = key
+        self.hits[stage] = hit
+        return value
+
+    def report(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Stage": list(self.hits),
+            "Cache": ["hit" if hit else "computed" for hit in self.hits.values()],
+        })
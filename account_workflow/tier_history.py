@@ -0,0 +1,134 @@
+"""
+On-disk history of each run's per-email tiers, one Parquet snapshot per
+day partitioned by month, and the tier changes between two snapshots.
+"""
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from account_workflow.tiers import TIER_DTYPE
+
+SNAPSHOT_COLUMNS = ["Email", "Tier", "Amount_per_month"]
+# Snapshots are sorted by email, so row group statistics prune email lookups
+ROW_GROUP_ROWS = 64_000
+
+CHANGES = ["Upgrade", "Downgrade", "New", "Churned"]
+CHANGE_DTYPE = pd.CategoricalDtype(CHANGES)
+
+
+def tier_snapshot(final_merged: pd.DataFrame) -> pd.DataFrame:
+    """One row per email with its tier (in ``TIER_DTYPE``) and amount per month, sorted by email."""
+    snapshot = final_merged.loc[final_merged["Email"].notna(), SNAPSHOT_COLUMNS]
+    snapshot = snapshot.drop_duplicates("Email").astype({"Tier": TIER_DTYPE, "Amount_per_month": "float64"})
+    return snapshot.sort_values("Email", ignore_index=True)
+
+
+def tier_delta(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Emails whose tier changed between two snapshots: Upgrade/Downgrade
+    (by ``TIER_ORDER`` rank), New (only in ``current``) and Churned (only
+    in ``previous``). Unchanged emails are left out.
+    """
+    merged = previous[SNAPSHOT_COLUMNS].merge(
+        current[SNAPSHOT_COLUMNS], on="Email", how="outer", suffixes=("_Previous", ""), indicator=True
+    )
+    before = merged["Tier_Previous"].astype(TIER_DTYPE).cat.codes.to_numpy()
+    after = merged["Tier"].astype(TIER_DTYPE).cat.codes.to_numpy()
+    side = merged.pop("_merge").to_numpy()
+    change = np.select(
+        [side == "right_only", side == "left_only", after < before, after > before],
+        ["New", "Churned", "Upgrade", "Downgrade"],
+        default=None,
+    )
+    delta = merged.rename(columns={"Tier_Previous": "Previous_Tier", "Amount_per_month_Previous": "Previous_Amount_per_month"})
+    delta["Change"] = pd.Categorical(change, dtype=CHANGE_DTYPE)
+    delta = delta[delta["Change"].notna()]
+    columns = ["Email", "Change", "Previous_Tier", "Tier", "Previous_Amount_per_month", "Amount_per_month"]
+    return delta[columns].astype({"Previous_Tier": TIER_DTYPE, "Tier": TIER_DTYPE}).reset_index(drop=True)
+
+
+def delta_summary(delta: pd.DataFrame) -> pd.DataFrame:
+    """Number of emails per change and tier transition."""
+    return (
+        delta.groupby(["Change", "Previous_Tier", "Tier"], observed=True, dropna=False)
+        .size().rename("Number_of_Users").reset_index()
+    )
+
+
+class TierHistory:
+    """
+    Tier snapshots under ``root/<YYYY-MM>/<YYYY-MM-DD>.parquet``, one per
+    day (a later run on the same day replaces it). Comparing two runs
+    reads just the two snapshots; queries over a date range read only the
+    partitions in range, and only the row groups holding the given emails.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def snapshot_path(self, day: date) -> Path:
+        return self.root / f"{day:%Y-%m}" / f"{day:%Y-%m-%d}.parquet"
+
+    def snapshot_dates(self, from_date: date = None, to_date: date = None) -> List[date]:
+        if not self.root.exists():
+            return []
+        days = sorted(date.fromisoformat(p.stem) for p in self.root.glob("*/*.parquet"))
+        return [d for d in days if (from_date is None or d >= from_date) and (to_date is None or d <= to_date)]
+
+    def previous_date(self, day: date) -> Optional[date]:
+        """Latest snapshot strictly before ``day``."""
+        earlier = [d for d in self.snapshot_dates(to_date=day) if d < day]
+        return earlier[-1] if earlier else None
+
+    def record(self, final_merged: pd.DataFrame, day: date) -> pd.DataFrame:
+        """Store ``day``'s snapshot of ``final_merged`` and return it."""
+        snapshot = tier_snapshot(final_merged)
+        path = self.snapshot_path(day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        snapshot.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp, path)
+        return snapshot
+
+    def load(self, day: date, emails: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        filters = None if emails is None else [("Email", "in", list(emails))]
+        snapshot = pd.read_parquet(self.snapshot_path(day), filters=filters)
+        return snapshot.astype({"Tier": TIER_DTYPE})
+
+    def record_run(self, final_merged: pd.DataFrame, day: date) -> Tuple[Optional[date], Optional[pd.DataFrame]]:
+        """
+        Store ``day``'s snapshot and compare it with the latest earlier one.
+        Returns that snapshot's date and the ``tier_delta`` (both None on the
+        first run).
+        """
+        current = self.record(final_merged, day)
+        previous_day = self.previous_date(day)
+        if previous_day is None:
+            return None, None
+        return previous_day, tier_delta(self.load(previous_day), current)
+
+    def delta(self, from_day: date, to_day: date) -> pd.DataFrame:
+        """``tier_delta`` between two stored snapshots."""
+        return tier_delta(self.load(from_day), self.load(to_day))
+
+    def timeline(self, from_date: date = None, to_date: date = None,
+                 emails: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Stored snapshots in the range stacked with a ``Snapshot_Date`` column, optionally for some emails only."""
+        emails = None if emails is None else list(emails)
+        frames = []
+        for day in self.snapshot_dates(from_date, to_date):
+            snapshot = self.load(day, emails)
+            snapshot.insert(0, "Snapshot_Date", pd.Timestamp(day))
+            frames.append(snapshot)
+        if not frames:
+            return pd.DataFrame({
+                "Snapshot_Date": pd.Series(dtype="datetime64[s]"),
+                "Email": pd.Series(dtype=object),
+                "Tier": pd.Series(dtype=TIER_DTYPE),
+                "Amount_per_month": pd.Series(dtype="float64"),
+            })
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,87 @@
+"""Declarative tier rules evaluated as vectorized masks."""
+import json
+import operator
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+TIER_ORDER = ['VIP', 'Platinum', 'Gold', 'Silver', 'Bronze']
+DEFAULT_TIER = 'Bronze'
+TIER_DTYPE = pd.CategoricalDtype(TIER_ORDER, ordered=True)
+
+_OPERATORS = {'>=': operator.ge, '>': operator.gt}
+
+# (tier, minimum Duration_Months, comparison, Amount_per_month threshold),
+# listed in priority order: the first matching rule wins.
+TIER_RULES: List[Tuple[str, int, str, float]] = [
+    ('VIP', 24, '>=', 30),
+    ('Platinum', 12, '>', 120),
+    ('Platinum', 6, '>', 180),
+    ('Platinum', 3, '>', 300),
+    ('Gold', 6, '>', 80),
+    ('Gold', 3, '>', 120),
+    ('Silver', 6, '>=', 60),
+    ('Silver', 3, '>', 80),
+]
+
+
+def _tier_inputs(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Duration/amount arrays with non-numeric or missing values treated as 0."""
+    duration = pd.to_numeric(df['Duration_Months'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    amount = pd.to_numeric(df['Amount_per_month'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return np.trunc(duration), amount
+
+
+def _evaluate(rules, duration, amount, masks: Dict[tuple, np.ndarray], default: str) -> np.ndarray:
+    conditions = []
+    for tier, min_duration, op, threshold in rules:
+        key = (min_duration, op, threshold)
+        if key not in masks:
+            masks[key] = (duration >= min_duration) & _OPERATORS[op](amount, threshold)
+        conditions.append(masks[key])
+    choices = [rule[0] for rule in rules]
+    return np.select(conditions, choices, default=default)
+
+
+def assign_tiers(df: pd.DataFrame, rules=TIER_RULES, default: str = DEFAULT_TIER) -> pd.Series:
+    """Tier for every row of ``df`` (needs 'Duration_Months' and 'Amount_per_month')."""
+    duration, amount = _tier_inputs(df)
+    tiers = _evaluate(rules, duration, amount, {}, default)
+    return pd.Series(tiers, index=df.index, name='Tier', dtype=object)
+
+
+def compare_rule_sets(df: pd.DataFrame, rule_sets: Dict[str, list], default: str = DEFAULT_TIER) -> pd.DataFrame:
+    """
+    Score several candidate rule sets in one pass.
+    Returns one tier column per rule set; masks for identical
+    (duration, comparison, amount) conditions are computed only once.
+    """
+    duration, amount = _tier_inputs(df)
+    masks: Dict[tuple, np.ndarray] = {}
+    scored = {name: _evaluate(rules, duration, amount, masks, default) for name, rules in rule_sets.items()}
+    return pd.DataFrame(scored, index=df.index)
+
+
+def read_rule_sets(path) -> Dict[str, list]:
+    """
+    Candidate rule sets from a JSON file shaped like
+    ``{"name": [[tier, min_duration, comparison, threshold], ...]}``,
+    for ``compare_rule_sets``. Raises ValueError on a malformed rule.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    rule_sets = {}
+    for name, rules in raw.items():
+        for rule in rules:
+            if len(rule) != 4 or rule[2] not in _OPERATORS:
+                raise ValueError(f"Rule set '{name}': expected [tier, min_duration, '>=' or '>', threshold], got {rule}")
+        rule_sets[name] = [tuple(rule) for rule in rules]
+    return rule_sets
+
+
+def tier_distribution(tiers: pd.DataFrame) -> pd.DataFrame:
+    """Number of customers per tier (rows, in TIER_ORDER) for each scored rule set (columns)."""
+    counts = {name: col.value_counts() for name, col in tiers.items()}
+    order = TIER_ORDER + sorted(set().union(*[c.index for c in counts.values()]) - set(TIER_ORDER))
+    return pd.DataFrame(counts).reindex(order).fillna(0).astype(int)
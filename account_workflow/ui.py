@@ -0,0 +1,245 @@
+"""
+Streamlit glue shared by the apps: the process-wide stage cache, a stage
+hook that shows each pipeline stage as a spinner, the run report, the
+memory saved by the compact layout, the payments attributed through
+identity resolution, a paged viewer for the final dataset, its
+on-demand exports, the tier changes since the previous run,
+drill-downs over the analytics cube, and the background job runner
+with a live view of a job's progress.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from account_workflow.cube import DIMENSIONS, query_cube
+from account_workflow.export import EXPORT_FORMATS, export_bytes, export_format
+from account_workflow.instrumentation import Instrumentation, report_frame
+from account_workflow.jobs import ACTIVE_STATES, JOBS_DIR, JobRunner, JobStore
+from account_workflow.pipeline import CACHE_DIR, STAGES
+from account_workflow.stage_cache import StageCache
+from account_workflow.tier_history import delta_summary
+from account_workflow.viewer import FILTER_COLUMNS, PAGE_SIZES, filter_options, page_count, page_rows, view_positions
+
+RUN_REPORT_DIR = os.path.join(CACHE_DIR, "run_reports")
+
+
+@st.cache_resource
+def get_stage_cache() -> StageCache:
+    return StageCache()
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    return JobRunner(JobStore(JOBS_DIR))
+
+
+@st.cache_resource(max_entries=4)
+def load_job_result(job_id: str) -> Dict[str, Any]:
+    """A finished job's results, read from disk once and shared by every session that opens the job."""
+    return get_job_runner().load_result(job_id)
+
+
+@contextmanager
+def stage_spinner(stage: str):
+    """``run_pipeline`` stage hook: spinner while running, error + stop on failure."""
+    label = STAGES.get(stage, stage)
+    with st.spinner(f"🔧 {label}..."):
+        try:
+            yield
+        except Exception as e:
+            st.error(f"{stage} failed: {e}")
+            st.stop()
+    st.success(f"{stage} done.")
+
+
+def show_run_report(instrumentation: Instrumentation, report_dir: str = RUN_REPORT_DIR):
+    """
+    Stage breakdown table plus the JSON run report, saved under
+    ``report_dir`` (once, on first display) and offered for download.
+    """
+    instrumentation.finish()
+    path = instrumentation.report_path or instrumentation.write_report(report_dir)
+    show_stage_report(instrumentation.to_dict(), path)
+
+
+def show_stage_report(report: Dict[str, Any], path: str):
+    """Stage breakdown of a run report (``Instrumentation.to_dict``) saved at ``path``, offered for download."""
+    with st.expander("Stage breakdown"):
+        st.dataframe(report_frame(report["stages"]), hide_index=True)
+        st.caption(f"Run report saved to {path}")
+        st.download_button("⬇️ Download run report (JSON)", json.dumps(report, indent=2),
+                           file_name=os.path.basename(path), mime="application/json")
+
+
+def show_memory_savings(savings: pd.DataFrame):
+    """Per-column memory before/after the compact layout (``run_pipeline``'s ``memory_savings``)."""
+    total = savings.set_index("Column").loc["Total"]
+    with st.expander(
+        f"Memory layout: {total['After_MB']:.2f} MB, {total['Saved_MB']:.2f} MB ({total['Saved_%']:.0f}%) saved"
+    ):
+        st.dataframe(savings, hide_index=True)
+
+
+def show_attribution(attribution: Optional[pd.DataFrame]):
+    """Payment events credited to an email directly and through linked ids (``payments.email_attribution``)."""
+    if attribution is None:
+        return
+    counts = attribution.iloc[0]
+    st.caption(
+        f"Payment attribution: {counts['With_Email']:,} events with an email, "
+        f"{counts['Newly_Attributed']:,} attributed through linked ids, {counts['Unattributed']:,} unattributed."
+    )
+
+
+def show_result_viewer(final_merged: pd.DataFrame, tier_summary: pd.DataFrame, result_id: str,
+                       key: str = "result"):
+    """
+    Tier summary with drill-down (select a row to see that tier) over a
+    paged view of ``final_merged``: filtering, sorting and paging happen
+    here, only the current page is sent to the browser. ``result_id``
+    (the job or run ID) identifies the data the cached view belongs to.
+    """
+    st.subheader("📊 Tier Summary")
+    event = st.dataframe(tier_summary, hide_index=True, on_select="rerun", selection_mode="single-row",
+                         key=f"{key}_summary")
+    drilled = [tier_summary["Tier"].iloc[r] for r in event.selection.rows]
+    if drilled:
+        st.caption(f"Showing tier {drilled[0]} only; clear the selection above to see every tier.")
+
+    st.subheader("📄 Final Merged Data")
+    filters = {}
+    for col, (column, label) in zip(st.columns(len(FILTER_COLUMNS)), FILTER_COLUMNS.items()):
+        if column not in final_merged.columns:
+            continue
+        with col:
+            if column == "Tier" and drilled:
+                filters[column] = drilled
+                st.multiselect(label, drilled, drilled, disabled=True, key=f"{key}_drilled")
+            else:
+                filters[column] = st.multiselect(label, filter_options(final_merged, column), key=f"{key}_{column}")
+    sort_col, order_col, size_col = st.columns([2, 1, 1])
+    sort_by = sort_col.selectbox("Sort by", [None] + list(final_merged.columns), key=f"{key}_sort",
+                                 format_func=lambda c: "(output order)" if c is None else c)
+    ascending = order_col.radio("Order", ["Ascending", "Descending"], horizontal=True, key=f"{key}_order") == "Ascending"
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    # positions are recomputed only when the data or the view changes; not keyed on
+    # id(final_merged), which a newly loaded result can reuse once the old one is freed
+    signature = (result_id, len(final_merged), repr(sorted(filters.items())), sort_by, ascending)
+    view = st.session_state.get(f"{key}_view")
+    if view is None or view[0] != signature:
+        view = (signature, view_positions(final_merged, filters, sort_by, ascending))
+        st.session_state[f"{key}_view"] = view
+        st.session_state[f"{key}_page"] = 1
+    positions = view[1]
+
+    pages = page_count(len(positions), page_size)
+    st.session_state[f"{key}_page"] = min(st.session_state[f"{key}_page"], pages)
+    page = st.number_input("Page", 1, pages, key=f"{key}_page")
+    st.dataframe(page_rows(final_merged, positions, page, page_size), hide_index=True, use_container_width=True)
+    first = (page - 1) * page_size
+    st.caption(f"Page {page:,} of {pages:,}: rows {min(first + 1, len(positions)):,}–"
+               f"{min(first + page_size, len(positions)):,} of {len(positions):,} matching "
+               f"({len(final_merged):,} total)")
+
+
+def show_exports(final_merged: pd.DataFrame, file_name: str = "final_merged_output.csv", key: str = "export"):
+    """
+    Download button for ``final_merged`` as CSV, gzip CSV or Parquet,
+    optionally zipped as one file per tier. Nothing is serialized until
+    the button is clicked.
+    """
+    try:
+        stem = file_name[:-len(export_format(file_name)) - 1]
+    except ValueError:
+        stem = file_name
+    format_col, tier_col = st.columns(2)
+    fmt = format_col.selectbox("Export format", list(EXPORT_FORMATS), key=f"{key}_format")
+    by_tier = tier_col.checkbox("One file per tier (zip)", False, key=f"{key}_by_tier")
+    st.download_button(
+        "⬇️ Download Final " + ("files per tier" if by_tier else fmt.upper()),
+        lambda: export_bytes(final_merged, fmt, by_tier, stem),
+        file_name=f"{stem}_by_tier.zip" if by_tier else f"{stem}.{fmt}",
+        mime="application/zip" if by_tier else EXPORT_FORMATS[fmt],
+        on_click="ignore",
+        key=f"{key}_download",
+    )
+
+
+def show_tier_changes(previous_day: Optional[date], delta: Optional[pd.DataFrame]):
+    """Upgrades, downgrades, new and churned customers since the previous snapshot (``TierHistory.record_run``)."""
+    st.subheader("🔀 Tier Changes")
+    if delta is None:
+        st.caption("First tier snapshot recorded; changes are reported from the next run on.")
+        return
+    counts = delta["Change"].value_counts(sort=False)
+    st.caption(f"Compared with the snapshot of {previous_day}.")
+    for col, change in zip(st.columns(len(counts)), counts.index):
+        col.metric(change, f"{counts[change]:,}")
+    st.dataframe(delta_summary(delta), hide_index=True)
+    st.download_button(
+        "⬇️ Download tier changes (CSV)",
+        lambda: export_bytes(delta, "csv"),
+        file_name=f"tier_changes_since_{previous_day}.csv",
+        mime="text/csv",
+        on_click="ignore",
+        key="tier_changes_download",
+    )
+
+
+def show_cube_explorer(cube: pd.DataFrame, key: str = "cube", max_rows: int = 500):
+    """Drill-downs answered from the precomputed cube (``cube.query_cube``), never from customer rows."""
+    st.subheader("🧊 Drill-down")
+    by = st.multiselect("Break down by", DIMENSIONS, ["Tier"], key=f"{key}_by")
+    filters = {}
+    for col, dim in zip(st.columns(len(DIMENSIONS)), DIMENSIONS):
+        filters[dim] = col.multiselect(dim, cube[dim].cat.categories.tolist(), key=f"{key}_{dim}")
+    start = time.perf_counter()
+    answer = query_cube(cube, by, filters)
+    elapsed = time.perf_counter() - start
+    st.dataframe(answer.sort_values("Customers", ascending=False).head(max_rows), hide_index=True,
+                 use_container_width=True)
+    shown = f"top {max_rows:,} of " if len(answer) > max_rows else ""
+    st.caption(f"{shown}{len(answer):,} group(s), answered from the cube in {elapsed * 1000:.1f} ms. "
+               "Quantiles are blank when a dimension not broken down by is filtered to several values.")
+
+
+def follow_job(runner: JobRunner, job_id: str, labels: Dict[str, str] = STAGES,
+               poll_seconds: float = 0.5) -> Optional[Dict[str, Any]]:
+    """
+    Show a job's progress until it finishes: a spinner for the running
+    stage (``labels`` maps stage names to spinner text), its latest status
+    line, and its messages as they arrive (all of them, for a job opened
+    later). Returns the job's final status, or None for an unknown ID.
+    """
+    status_line = st.empty()
+    shown = 0
+    while True:
+        job = runner.get(job_id)
+        if job is None:
+            return None
+        for event in job["events"][shown:]:
+            (st.success if event["kind"] == "success" else st.caption)(event["message"])
+        shown = len(job["events"])
+        if job["state"] not in ACTIVE_STATES:
+            break
+        stage = job["stage"]
+        with st.spinner(f"🔧 {labels.get(stage, stage)}..." if stage else "⏳ Waiting for a free worker..."):
+            while True:
+                time.sleep(poll_seconds)
+                current = runner.get(job_id)
+                status_line.text(current["message"] or "")
+                if (current["state"], current["stage"], len(current["events"])) != (job["state"], stage, shown):
+                    break
+    status_line.empty()
+    if job["state"] == "failed":
+        st.error(job["error"])
+    elif job["state"] == "interrupted":
+        st.warning("This run was cut off by an app restart; run the workflow again.")
+    return job
@@ -0,0 +1,53 @@
+"""
+Server-side paging of the final dataset: filter and sort on the full
+frame, hand out one page of rows at a time.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns the result viewer filters on, with their labels
+FILTER_COLUMNS: Dict[str, str] = {"Tier": "Tier", "Phone_Country": "Country", "Workspace": "Workspace"}
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def filter_options(df: pd.DataFrame, column: str) -> List:
+    """Values of ``column`` present in ``df``, in category order for categoricals."""
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories().cat.categories.tolist()
+    return sorted(values.dropna().unique().tolist())
+
+
+def view_positions(
+    df: pd.DataFrame,
+    filters: Optional[Dict[str, Sequence]] = None,
+    sort_by: Optional[str] = None,
+    ascending: bool = True,
+) -> np.ndarray:
+    """
+    Row positions of ``df`` matching every non-empty filter (column ->
+    allowed values), ordered by ``sort_by`` (stable, missing values last;
+    ordered categoricals such as Tier sort by rank).
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= df[column].isin(values).to_numpy(dtype=bool)
+    positions = np.flatnonzero(mask)
+    if sort_by is not None:
+        keys = df[sort_by].iloc[positions]
+        order = keys.reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last").index
+        positions = positions[order.to_numpy()]
+    return positions
+
+
+def page_count(rows: int, page_size: int) -> int:
+    return max(1, -(-rows // page_size))
+
+
+def page_rows(df: pd.DataFrame, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+    """Page ``page`` (1-based) of the rows at ``positions``."""
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]]
@@ -0,0 +1,207 @@
+"""
+The Mixpanel app's full fetch-and-process chain without Streamlit, so it
+can run as a background job: fetch events, read or sync contacts, merge
+the payment history, run the pipeline and record the tier history.
+"""
+import io
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from account_workflow.event_store import HOT_DAYS, EventStore
+from account_workflow.identity import build_identity_map
+from account_workflow.ingest import PAYMENT_MIXPANEL, PIPEDRIVE_CONTACTS, read_source
+from account_workflow.instrumentation import Instrumentation
+from account_workflow.mixpanel import (
+    PAYMENT_EVENT,
+    PAYMENT_PROPERTIES,
+    UNPAID_SIGNUP_EVENT,
+    UNPAID_SIGNUP_PROPERTIES,
+    make_session,
+)
+from account_workflow.payment_state import update_payment_state
+from account_workflow.payments import email_attribution, payment_summary
+from account_workflow.pipedrive import sync_persons
+from account_workflow.pipeline import (
+    CACHE_DIR,
+    EVENT_STORE_DIR,
+    STAGES,
+    TIER_HISTORY_DIR,
+    StageHook,
+    _no_hook,
+    fetch_events,
+    run_pipeline,
+)
+from account_workflow.stage_cache import StageRun, content_hash
+from account_workflow.tier_history import TierHistory
+
+PAYMENT_STATE_DIR = os.path.join(CACHE_DIR, "payment_state")
+PIPEDRIVE_STORE_DIR = os.path.join(CACHE_DIR, "pipedrive")
+
+# Progress labels for the stages this chain adds around run_pipeline's
+STAGE_LABELS = {
+    **STAGES,
+    f"Fetch {PAYMENT_EVENT}": f"Fetching '{PAYMENT_EVENT}' from Mixpanel",
+    f"Fetch {UNPAID_SIGNUP_EVENT}": f"Fetching '{UNPAID_SIGNUP_EVENT}' from Mixpanel",
+    "Read payment Mixpanel CSV": "Reading uploaded Payment Mixpanel CSV",
+    "Pipedrive contacts": "Reading Pipedrive contacts",
+    "Payment history update": "Merging fetched payments into the payment history",
+    "Tier history": "Recording the tier history",
+}
+
+# Payment state and tier history are read-modify-write stores shared by every run
+_STORE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class WorkflowParams:
+    from_date: date
+    to_date: date
+    shard: str = "week"
+    fetch_workers: int = 3
+    use_event_store: bool = True
+    hot_days: int = HOT_DAYS
+    use_payment_state: bool = True
+    sync_pipedrive: bool = False
+    full_pipedrive_sync: bool = False
+    record_history: bool = True
+    trace_memory: bool = False
+    today: date = field(default_factory=date.today)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v.isoformat() if isinstance(v, date) else v for k, v in asdict(self).items()}
+
+
+def _ignore(message: str, kind: str = "note"):
+    pass
+
+
+def run_mixpanel_workflow(
+    params: WorkflowParams,
+    payment_mixpanel_csv: bytes,
+    pipedrive_csv: Optional[bytes],
+    credentials: Dict[str, str],
+    *,
+    run: Optional[StageRun] = None,
+    stage_hook: Optional[StageHook] = None,
+    notify: Callable[[str, str], None] = _ignore,
+    report_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run the whole chain and return ``run_pipeline``'s result plus the
+    attribution counts, the tier changes (``tier_previous_day`` and
+    ``tier_delta``, with ``record_history``) and the run ``report``
+    (``Instrumentation.to_dict``), also saved under ``report_dir`` if
+    given (``report_path``).
+
+    ``credentials`` holds ``MIXPANEL_API_KEY`` and ``MIXPANEL_PROJECT_ID``,
+    and ``PIPEDRIVE_API_TOKEN`` / ``PIPEDRIVE_COMPANY_DOMAIN`` when
+    ``sync_pipedrive`` is set (``pipedrive_csv`` is used otherwise).
+    ``stage_hook(name)`` wraps every stage; ``notify(message, kind)``
+    reports progress: kind "success" (sent inside the stage it reports
+    on) or "note" for a finished step, "status" for transient progress.
+    """
+    instrumentation = Instrumentation(hook=stage_hook or _no_hook, trace_allocations=params.trace_memory, run=run)
+
+    def cached(stage: str, inputs: list, compute: Callable[[], Any]):
+        return compute() if run is None else run.run(stage, inputs, compute)
+
+    today = pd.Timestamp(params.today)
+    store = EventStore(EVENT_STORE_DIR, hot_days=params.hot_days) if params.use_event_store else None
+    # one connection pool shared by every shard of both events
+    session = make_session(params.fetch_workers)
+
+    def fetch(event_name: str, properties: list) -> pd.DataFrame:
+        with instrumentation(f"Fetch {event_name}") as record:
+            df, fetched_days = fetch_events(
+                event_name, properties, params.from_date, params.to_date,
+                api_key=credentials["MIXPANEL_API_KEY"], project_id=credentials["MIXPANEL_PROJECT_ID"],
+                store=store, shard=params.shard, max_workers=params.fetch_workers, session=session, today=params.today,
+                progress=lambda done, total, shard, rows: notify(
+                    f"Shard {done}/{total} done: {shard[0]} → {shard[1]} ({rows} rows)", "status"),
+            )
+            record.observe(output=df)
+            if fetched_days is not None:
+                notify(f"'{event_name}': fetched {len(fetched_days)} day(s), rest loaded from local cache.", "note")
+            notify(f"Fetched '{event_name}' — rows: {len(df)}", "success")
+        return df
+
+    payment_api_export = fetch(PAYMENT_EVENT, PAYMENT_PROPERTIES)
+    unpaid_user = fetch(UNPAID_SIGNUP_EVENT, UNPAID_SIGNUP_PROPERTIES)
+
+    with instrumentation("Read payment Mixpanel CSV") as record:
+        payment_mixpanel_export = cached(
+            "Read payment Mixpanel CSV", [content_hash(payment_mixpanel_csv)],
+            lambda: read_source(io.BytesIO(payment_mixpanel_csv), PAYMENT_MIXPANEL),
+        )
+        record.observe(output=payment_mixpanel_export)
+        notify(f"Loaded Payment Mixpanel upload — rows: {len(payment_mixpanel_export)}", "success")
+
+    with instrumentation("Pipedrive contacts") as record:
+        if params.sync_pipedrive:
+            synced = sync_persons(
+                PIPEDRIVE_STORE_DIR,
+                credentials["PIPEDRIVE_API_TOKEN"],
+                company_domain=credentials["PIPEDRIVE_COMPANY_DOMAIN"],
+                full=params.full_pipedrive_sync,
+                progress=lambda page, persons: notify(f"Page {page}: {persons} changed persons", "status"),
+            )
+            pipedrive_contacts = synced["contacts"]
+            cached("Pipedrive contacts", [content_hash(pipedrive_contacts)], lambda: pipedrive_contacts)
+            message = (f"Synced Pipedrive persons — {synced['fetched']} fetched, "
+                       f"{synced['total']} stored, {len(pipedrive_contacts)} with email")
+        else:
+            pipedrive_contacts = cached(
+                "Pipedrive contacts", [content_hash(pipedrive_csv)],
+                lambda: read_source(io.BytesIO(pipedrive_csv), PIPEDRIVE_CONTACTS),
+            )
+            message = f"Loaded Pipedrive contacts — rows: {len(pipedrive_contacts)}"
+        record.observe(output=pipedrive_contacts)
+        notify(message, "success")
+
+    pay1 = attribution = None
+    if params.use_payment_state:
+        with instrumentation("Identity resolution") as record:
+            identity_map = build_identity_map([payment_api_export, unpaid_user])
+            record.observe([payment_api_export, unpaid_user], identity_map)
+        with instrumentation("Identity attribution") as record:
+            attribution = email_attribution(payment_api_export, identity_map)
+            record.observe([payment_api_export], attribution)
+        with instrumentation("Payment history update") as record, _STORE_LOCK:
+            payment_dates, settled_through = update_payment_state(
+                PAYMENT_STATE_DIR, payment_api_export, params.from_date, params.to_date,
+                settle_before=params.today - timedelta(days=int(params.hot_days)),
+                identity_map=identity_map,
+            )
+            pay1 = payment_summary(payment_dates, today=today)
+            record.observe([payment_api_export], pay1)
+        notify(f"Payment history settled through {settled_through} — {len(pay1)} emails.", "note")
+
+    result = run_pipeline(
+        payment_mixpanel_export, pipedrive_contacts, unpaid_user, payment_api_export, pay1,
+        today=today,
+        run=run,
+        input_keys={
+            "payment_mixpanel_export": "Read payment Mixpanel CSV",
+            "pipedrive_contacts": "Pipedrive contacts",
+        },
+        stage_hook=instrumentation,
+    )
+    if attribution is not None:
+        result["attribution"] = attribution
+    if params.record_history:
+        with instrumentation("Tier history") as record, _STORE_LOCK:
+            previous_day, delta = TierHistory(TIER_HISTORY_DIR).record_run(result["final_merged"], params.today)
+            record.observe([result["final_merged"]], delta)
+        result["tier_previous_day"] = previous_day
+        result["tier_delta"] = delta
+
+    instrumentation.finish()
+    result["report"] = instrumentation.to_dict()
+    if report_dir is not None:
+        result["report_path"] = instrumentation.write_report(report_dir)
+    return result
@@ -1,7 +1,32 @@
+import uuid
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-from math import ceil
+
+from account_workflow.ingest import (
+    PAYMENT_API,
+    PAYMENT_MIXPANEL,
+    PIPEDRIVE_CONTACTS,
+    UNPAID_USER,
+    SchemaError,
+    read_source,
+    read_source_chunks,
+)
+from account_workflow.instrumentation import Instrumentation
+from account_workflow.pipeline import TIER_HISTORY_DIR, reduce_payment_chunks, run_pipeline
+from account_workflow.stage_cache import StageRun, content_hash
+from account_workflow.tier_history import TierHistory
+from account_workflow.ui import (
+    get_stage_cache,
+    show_attribution,
+    show_cube_explorer,
+    show_exports,
+    show_memory_savings,
+    show_result_viewer,
+    show_run_report,
+    show_tier_changes,
+    stage_spinner,
+)
 
 st.set_page_config(page_title="Payment Tier Automation", layout="wide")
 
@@ -17,6 +42,19 @@ payment_api_file = st.file_uploader("Payment API Export CSV", type=["csv"])
 payment_mixpanel_file = st.file_uploader("Payment Mixpanel Export CSV", type=["csv"])
 pipedrive_contacts_file = st.file_uploader("Pipedrive Contacts CSV", type=["csv"])
 unpaid_user_file = st.file_uploader("Unpaid User Signup CSV", type=["csv"])
+stream_payments = st.checkbox(
+    "Read the Payment API export in chunks", False,
+    help="For exports too large to load at once: events are reduced to first/last payment per email chunk by chunk.",
+)
+resolve_identities = st.checkbox(
+    "Attribute payments without an email through linked Mixpanel ids", True,
+    help="Payment events with no email are credited to the email their distinct_id is linked to by other events.",
+)
+record_history = st.checkbox(
+    "Record tiers in the tier history", True,
+    help="Keep this run's tier per email and report upgrades, downgrades, new and churned customers since the last run.",
+)
+trace_memory = st.checkbox("Trace memory per stage (slower)", False)
 
 if st.button("🚀 Process Data"):
 
@@ -24,180 +62,84 @@ if st.button("🚀 Process Data"):
         st.error("Please upload **all four files** to continue.")
         st.stop()
 
-    # Read files
-    payment_api_export = pd.read_csv(payment_api_file, low_memory=False)
-    payment_mixpanel_export = pd.read_csv(payment_mixpanel_file)
-    pipedrive_contacts = pd.read_csv(pipedrive_contacts_file, low_memory=False)
-    unpaid_user = pd.read_csv(unpaid_user_file)
-
-    # ===============================
-    # 1. PAYMENT API PROCESSING
-    # ===============================
-    pay = payment_api_export[['time', '$email', 'distinct_id', '$distinct_id_before_identity']]
-
-    pay = pay.copy()
-    pay["email"] = pay.apply(
-        lambda x: (
-            x["$email"]
-            if "@" in str(x["$email"])
-            else (
-                x["$distinct_id_before_identity"]
-                if "@" in str(x["$distinct_id_before_identity"])
-                else (
-                    x["distinct_id"]
-                    if "@" in str(x["distinct_id"])
-                    else None
-                )
-            )
-        ),
-        axis=1
-    )
-
-    pay.columns = pay.columns.str.strip().str.title()
-    pay["Time"] = pd.to_datetime(pay["Time"], unit="s")
-    pay["Date"] = pay["Time"].dt.date
-
-    pay = pay[['Email', 'Time', 'Date']]
-    pay = pay.dropna(subset=['Email'])
-
-    # first + last payment
-    pay1 = pay.groupby('Email')['Date'].agg(
-        First_Payment='min',
-        Last_Payment='max'
-    ).reset_index()
+    # Unchanged uploads and stages are served from the cache
+    run = StageRun(get_stage_cache())
+    # Time, memory and rows per stage
+    instrumentation = Instrumentation(hook=stage_spinner, trace_allocations=trace_memory, run=run)
+
+    def read(stage, upload, schema):
+        with instrumentation.stage(stage) as record:
+            df = run.run(stage, [content_hash(upload)], lambda: read_source(upload, schema))
+            record.observe(output=df)
+        return df
+
+    # Read files (only the columns the pipeline uses)
+    try:
+        payment_api_export = None if stream_payments else read("Read payment API CSV", payment_api_file, PAYMENT_API)
+        payment_mixpanel_export = read("Read payment Mixpanel CSV", payment_mixpanel_file, PAYMENT_MIXPANEL)
+        pipedrive_contacts = read("Read Pipedrive contacts CSV", pipedrive_contacts_file, PIPEDRIVE_CONTACTS)
+        unpaid_user = read("Read unpaid user CSV", unpaid_user_file, UNPAID_USER)
+    except SchemaError as e:
+        st.error(str(e))
+        st.stop()
 
     today = pd.Timestamp.today()
-
-    pay1['First_Payment'] = pd.to_datetime(pay1['First_Payment'])
-
-    def months_since_first(date):
-        delta_years = today.year - date.year
-        delta_months = today.month - date.month
-        delta_days = today.day - date.day
-        total_months = delta_years * 12 + delta_months + delta_days / 30
-        return ceil(total_months)
-
-    pay1['Duration_Months'] = pay1['First_Payment'].apply(months_since_first)
+    input_keys = {
+        "payment_api_export": "Read payment API CSV",
+        "payment_mixpanel_export": "Read payment Mixpanel CSV",
+        "pipedrive_contacts": "Read Pipedrive contacts CSV",
+        "unpaid_user": "Read unpaid user CSV",
+    }
+    pay1 = attribution = None
+    if stream_payments:
+        pay1, attribution = reduce_payment_chunks(
+            lambda: read_source_chunks(payment_api_file, PAYMENT_API), unpaid_user,
+            today=today,
+            run=run,
+            input_keys={**input_keys, "payment_api_export": content_hash(payment_api_file)},
+            stage_hook=instrumentation,
+            resolve_identities=resolve_identities,
+        )
 
     # ===============================
-    # 2. MIXPANEL PAYMENT SUMMARY
+    # PAYMENTS, JOIN, TIERS, PHONES, SUMMARY
     # ===============================
-    pay2 = payment_mixpanel_export.groupby('Email').agg({
-        'A. Payment (all time)': 'sum',
-        'B. Amount (Year)': 'sum',
-        'C. Amount (Month)': 'sum',
-        'Workspace': 'first'
-    }).reset_index()
-
-    # Merge
-    pay_merged = pd.merge(pay1, pay2, on='Email', how='right')
-
-    pay_merged['Amount_per_month'] = np.where(
-        pay_merged['Duration_Months'] > 0,
-        pay_merged['A. Payment (all time)'] / pay_merged['Duration_Months'],
-        pay_merged['A. Payment (all time)']
+    result = run_pipeline(
+        payment_mixpanel_export, pipedrive_contacts, unpaid_user, payment_api_export, pay1,
+        today=today,
+        run=run,
+        input_keys=input_keys,
+        stage_hook=instrumentation,
+        resolve_identities=resolve_identities,
     )
-
-    pay_merged['Amount_per_month'] = pay_merged['Amount_per_month'].round(2)
-
-    # ===============================
-    # TIER FUNCTION
-    # ===============================
-
-    def assign_tier(row):
-        duration = row['Duration_Months']
-        amount = row['Amount_per_month']
-
-        if duration >= 24 and amount >= 30:
-            return 'VIP'
-        if (duration >= 12 and amount > 120) or \
-           (duration >= 6 and amount > 180) or \
-           (duration >= 3 and amount > 300):
-            return 'Platinum'
-        if (duration >= 6 and amount > 80) or \
-           (duration >= 3 and amount > 120):
-            return 'Gold'
-        if (duration >= 6 and amount >= 60) or \
-           (duration >= 3 and amount > 80):
-            return 'Silver'
-        return 'Bronze'
-
-    pay_merged['Tier'] = pay_merged.apply(assign_tier, axis=1)
-
-    # ===============================
-    # 3. PIPEDRIVE CONTACTS MERGE
-    # ===============================
-    pipedrive_contacts.columns = pipedrive_contacts.columns.str.title()
-    pipedrive_contacts['Email'] = pipedrive_contacts['Email'].str.strip()
-    pipedrive_contacts['Phone_Country_Name'] = pipedrive_contacts['Phone_Country_Name'].str.strip()
-
-    pipedrive_contacts = pipedrive_contacts.drop_duplicates(subset='Email')
-
-    pay_merged_contacts = pd.merge(pay_merged, pipedrive_contacts, on='Email', how='left')
-    pay_merged_contacts.drop_duplicates(subset='Email', inplace=True)
-
-    # ===============================
-    # 4. UNPAID USER MERGE
-    # ===============================
-    unpaid_user = unpaid_user[['$email', 'Phone Number', 'Phone Number Country']]
-    unpaid_user = unpaid_user.rename(columns={'$email': 'Email'})
-    unpaid_user = unpaid_user.drop_duplicates(subset='Email')
-
-    final_merged = pd.merge(pay_merged_contacts, unpaid_user, on="Email", how='left')
-
-    # ===============================
-    # PHONE CLEANING
-    # ===============================
-    undefined_values = ['', ' ', '  ', 'undefined', 'Undefined', 'none', 'None', 'nan', 'NaN']
-
-    final_merged['Phone Number'] = final_merged['Phone Number'].astype(str).str.strip().replace(undefined_values, pd.NA)
-    final_merged['Phone'] = final_merged['Phone'].astype(str).str.strip().replace(undefined_values, pd.NA)
-    final_merged['Phone_Country_Name'] = final_merged['Phone_Country_Name'].astype(str).str.strip().replace(undefined_values, pd.NA)
-    final_merged['Phone Number Country'] = final_merged['Phone Number Country'].astype(str).str.strip().replace(undefined_values, pd.NA)
-
-    final_merged['Phone_Number'] = final_merged['Phone Number'].fillna(final_merged['Phone'])
-    final_merged['Phone_Country'] = final_merged['Phone_Country_Name'].fillna(final_merged['Phone Number Country'])
-
-    final_merged = final_merged[['Email', 'Full_Name', 'First_Name', 'Last_Name', 'Phone_Number',
-                                 'Phone_Country', 'First_Payment', 'Last_Payment', 'Duration_Months',
-                                 'A. Payment (all time)', 'B. Amount (Year)', 'C. Amount (Month)',
-                                 'Workspace', 'Amount_per_month', 'Tier']]
-
-    # ===============================
-    # TIER SUMMARY
-    # ===============================
-    tier_summary = final_merged.groupby('Tier').agg(
-        Number_of_Users=('Email', 'count')
-    ).reset_index()
-
-    tier_summary['Percentage'] = (tier_summary['Number_of_Users'] /
-                                  tier_summary['Number_of_Users'].sum() * 100).round(2)
-
-    # ORDER TIERS
-    tier_order = ['VIP', 'Platinum', 'Gold', 'Silver', 'Bronze']
-    tier_summary['Tier'] = pd.Categorical(tier_summary['Tier'], categories=tier_order, ordered=True)
-    tier_summary = tier_summary.sort_values('Tier').reset_index(drop=True)
-
-
-    # ============================================
-    # OUTPUT SECTION
-    # ============================================
+    if attribution is not None:
+        result["attribution"] = attribution
+    if record_history:
+        with instrumentation("Tier history") as record:
+            result["tier_changes"] = TierHistory(TIER_HISTORY_DIR).record_run(result["final_merged"], today.date())
+            record.observe([result["final_merged"]], result["tier_changes"][1])
+    # kept across reruns, so the viewer can page and filter without reprocessing
+    st.session_state["results"] = dict(result, instrumentation=instrumentation, run_id=uuid.uuid4().hex[:12])
     st.success("Processing complete!")
 
-    st.subheader("📊 Tier Summary")
-    st.dataframe(tier_summary)
+
+# ============================================
+# OUTPUT SECTION
+# ============================================
+if "results" in st.session_state:
+    results = st.session_state["results"]
+    tier_summary = results["tier_summary"]
+    show_run_report(results["instrumentation"])
+    show_memory_savings(results["memory_savings"])
+    show_attribution(results["attribution"])
+    if "tier_changes" in results:
+        show_tier_changes(*results["tier_changes"])
 
     st.subheader("📈 Tier Summary Chart")
     st.bar_chart(tier_summary.set_index("Tier")["Number_of_Users"])
 
-    st.subheader("📄 Final Merged Data")
-    st.dataframe(final_merged, use_container_width=True)
+    show_result_viewer(results["final_merged"], tier_summary, results["run_id"])
+    show_cube_explorer(results["cube"])
 
-    # DOWNLOAD BUTTON
-    csv = final_merged.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="⬇ Download Final CSV",
-        data=csv,
-        file_name="final_merged_output.csv",
-        mime="text/csv"
-    )
+    # DOWNLOAD (serialized only when clicked)
+    show_exports(results["final_merged"])
@@ -0,0 +1 @@
+"""Synthetic data generator and pipeline benchmarks."""
@@ -0,0 +1,180 @@
+"""
+Pipeline benchmark: per-stage wall time and memory on synthetic inputs.
+
+    python -m benchmarks.run --scale 1m --repeat 3
+    python -m benchmarks.run --scale 1m --compare benchmarks/results/<earlier>.json
+
+Each repeat reads the four CSVs and runs every pipeline stage uncached,
+instrumented per stage. Timings come from untraced repeats; a final pass
+under tracemalloc gives each stage's peak allocations. Results are
+written as JSON to ``benchmarks/results`` tagged with the commit, so runs
+can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+from account_workflow.ingest import (
+    PAYMENT_API,
+    PAYMENT_MIXPANEL,
+    PIPEDRIVE_CONTACTS,
+    UNPAID_USER,
+    read_source,
+    read_source_chunks,
+)
+from account_workflow.instrumentation import MB, Instrumentation, peak_rss_bytes
+from account_workflow.pipeline import reduce_payment_chunks, run_pipeline
+from benchmarks.synthetic import GENERATOR_VERSION, SCALES, ensure_dataset
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+SCHEMAS = {
+    "payment_api_export": PAYMENT_API,
+    "payment_mixpanel_export": PAYMENT_MIXPANEL,
+    "pipedrive_contacts": PIPEDRIVE_CONTACTS,
+    "unpaid_user": UNPAID_USER,
+}
+
+
+def run_once(paths: Dict[str, str], today: pd.Timestamp, trace_allocations: bool = False,
+             chunk_rows: Optional[int] = None) -> Instrumentation:
+    instrumentation = Instrumentation(trace_allocations=trace_allocations)
+    inputs = {}
+    for name, schema in SCHEMAS.items():
+        if name == "payment_api_export" and chunk_rows:
+            continue
+        with instrumentation(f"Read {schema.label}") as record:
+            inputs[name] = read_source(paths[name], schema)
+            record.observe(output=inputs[name])
+    if chunk_rows:
+        inputs["pay1"], _ = reduce_payment_chunks(
+            lambda: read_source_chunks(paths["payment_api_export"], PAYMENT_API, chunk_rows), inputs["unpaid_user"],
+            today=today, stage_hook=instrumentation,
+        )
+    run_pipeline(**inputs, today=today, stage_hook=instrumentation)
+    instrumentation.finish()
+    return instrumentation
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(scale: str, repeat: int = 3, seed: int = 0, trace_memory: bool = True,
+              data_dir: str = DATA_DIR, chunk_rows: Optional[int] = None) -> dict:
+    """Run the pipeline ``repeat`` times on the ``scale`` dataset and return the result record."""
+    paths = ensure_dataset(scale, data_dir, seed)
+    today = pd.Timestamp("2025-11-01")  # fixed so Duration_Months does not drift between runs
+
+    runs = [{r.stage: r for r in run_once(paths, today, chunk_rows=chunk_rows).records} for _ in range(repeat)]
+    traced = {}
+    if trace_memory:
+        traced = {r.stage: r for r in run_once(paths, today, True, chunk_rows).records}
+
+    stages = []
+    for stage, first in runs[0].items():
+        seconds = [r[stage].seconds for r in runs]
+        stages.append({
+            "stage": stage,
+            "seconds_min": round(min(seconds), 4),
+            "seconds_median": round(statistics.median(seconds), 4),
+            "rows_in": first.rows_in,
+            "rows_out": first.rows_out,
+            "memory_out_mb": first.memory_out_mb,
+            "peak_alloc_mb": traced[stage].alloc_peak_mb if stage in traced else None,
+        })
+    return {
+        "scale": scale,
+        "events": SCALES[scale],
+        "seed": seed,
+        "generator_version": GENERATOR_VERSION,
+        "repeat": repeat,
+        "chunk_rows": chunk_rows,
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "stages": stages,
+        "total_seconds_median": round(sum(s["seconds_median"] for s in stages), 4),
+        "peak_rss_mb": round(peak_rss_bytes() / MB, 1) if peak_rss_bytes() is not None else None,
+    }
+
+
+def save_result(result: dict, results_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = result["timestamp"].replace(":", "").replace("-", "")
+    path = os.path.join(results_dir, f"{result['scale']}-{stamp}-{result['commit'] or 'nocommit'}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def compare(baseline: dict, current: dict) -> pd.DataFrame:
+    """
+    Per-stage median time and peak allocation of ``current`` against
+    ``baseline``. Raises ValueError if they ran on different datasets.
+    """
+    dataset = ("scale", "seed", "generator_version")
+    if [baseline.get(k) for k in dataset] != [current.get(k) for k in dataset]:
+        raise ValueError(
+            "Results are from different datasets: "
+            + ", ".join(f"{k} {baseline.get(k)} vs {current.get(k)}" for k in dataset)
+        )
+    base = pd.DataFrame(baseline["stages"]).set_index("stage")
+    cur = pd.DataFrame(current["stages"]).set_index("stage")
+    table = pd.DataFrame({
+        "baseline_s": base["seconds_median"],
+        "current_s": cur["seconds_median"],
+        "baseline_mb": base["peak_alloc_mb"],
+        "current_mb": cur["peak_alloc_mb"],
+    })
+    table["speedup"] = (table["baseline_s"] / table["current_s"]).round(2)
+    return table.reindex(list(cur.index) + [s for s in base.index if s not in cur.index])
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats (median and min are reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, help="Benchmark the chunked payment export mode")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Where generated datasets are kept")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", metavar="RESULT_JSON", help="Earlier result to compare against")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.scale, args.repeat, args.seed, not args.no_memory, args.data_dir, args.chunk_rows)
+    path = save_result(result, args.results_dir)
+
+    pd.set_option("display.width", 160)
+    print(pd.DataFrame(result["stages"]).to_string(index=False))
+    print(f"\ntotal (median): {result['total_seconds_median']:.3f}s, peak RSS: {result['peak_rss_mb']} MiB")
+    print(f"result: {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        try:
+            print("\n" + compare(baseline, result).to_string())
+        except ValueError as e:
+            print(f"\nnot compared: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
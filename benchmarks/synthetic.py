@@ -0,0 +1,211 @@
+"""
+Synthetic inputs for the four pipeline sources, at benchmark scale.
+
+    python -m benchmarks.synthetic --scale 1m --out benchmarks/data/1m
+
+The scale is the number of payment API events; the other sources are
+sized from the number of paying customers it implies (about one customer
+per ``EVENTS_PER_CUSTOMER`` events). Files are written in chunks so the
+10M scale does not need the whole event table in memory.
+"""
+import argparse
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from account_workflow.mixpanel import PAYMENT_EVENT
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# File name per source, as read by benchmarks.run
+FILES = {
+    "payment_api_export": "payment_api.csv",
+    "payment_mixpanel_export": "payment_mixpanel.csv",
+    "pipedrive_contacts": "pipedrive_contacts.csv",
+    "unpaid_user": "unpaid_user.csv",
+}
+
+EVENTS_PER_CUSTOMER = 8
+CHUNK_ROWS = 1_000_000
+# Bump whenever the generated data changes: it names the dataset directory,
+# so a cached dataset is never reused for a different generator, and it is
+# recorded with every benchmark result.
+GENERATOR_VERSION = 3
+
+FIRST_EVENT_TIME = int(pd.Timestamp("2019-01-01").timestamp())
+LAST_EVENT_TIME = int(pd.Timestamp("2025-10-31").timestamp())
+MONTH_SECONDS = 30 * 86_400
+
+# Customer profiles, calibrated so every tier of tiers.TIER_RULES shows up:
+# tenure is mostly recent (exponential, in months) and monthly spend is
+# log-normal around the Silver/Gold thresholds.
+TENURE_MEAN_MONTHS = 14
+MONTHLY_SPEND_MEDIAN = 40.0
+MONTHLY_SPEND_SIGMA = 0.9
+
+DOMAINS = np.array(["gmail.com", "yahoo.com", "outlook.com", "qq.com", "agrifolio.io", "company.co.uk"])
+WORKSPACES = np.array(["Agrifolio", "RXCOOLERS INTERNATIONAL LIMITED", "global", "Acme", "Northwind", "Contoso"])
+COUNTRIES = np.array(["United States", " India ", "United Kingdom", "Russia", "Nigeria", None], dtype=object)
+COUNTRY_CODES = np.array(["US", "IN", "GB", "RU", "NG", "undefined"], dtype=object)
+# Pipedrive/Mixpanel phone values as they come in: formatted, bare digits, placeholders, blanks
+JUNK_PHONES = np.array(["undefined", "", "n/a", "0", None], dtype=object)
+PHONE_FORMATS = np.array(["+1 (555) {}", "+44 7911 {}", "0091 98{}", "7903{}", "{}"], dtype=object)
+
+
+def customer_emails(ids: np.ndarray) -> np.ndarray:
+    domains = DOMAINS[ids % len(DOMAINS)]
+    return np.char.add(np.char.add("user", ids.astype(str)), np.char.add("@", domains)).astype(object)
+
+
+def _phones(rng: np.random.Generator, n: int, junk_share: float) -> np.ndarray:
+    digits = rng.integers(1_000_000, 9_999_999, n).astype(str)
+    formats = PHONE_FORMATS[rng.integers(0, len(PHONE_FORMATS), n)]
+    phones = np.array([f.format(d) for f, d in zip(formats, digits)], dtype=object)
+    junk = rng.random(n) < junk_share
+    phones[junk] = JUNK_PHONES[rng.integers(0, len(JUNK_PHONES), junk.sum())]
+    return phones
+
+
+def customer_tenure(rng: np.random.Generator, customers: int) -> np.ndarray:
+    """Months each customer has been paying for, between 1 and the whole event range."""
+    longest = (LAST_EVENT_TIME - FIRST_EVENT_TIME) // MONTH_SECONDS
+    return np.clip(np.ceil(rng.exponential(TENURE_MEAN_MONTHS, customers)), 1, longest).astype(np.int64)
+
+
+def payment_api_chunk(rng: np.random.Generator, n: int, tenure: np.ndarray) -> pd.DataFrame:
+    """
+    ``n`` 'New Payment Made' events, each customer's spread over their
+    ``tenure`` months up to the last event time. Identity is mixed the way
+    Mixpanel exports it: 60% carry ``$email``, 15% only an email in
+    ``$distinct_id_before_identity``, 10% an email as ``distinct_id`` and
+    15% no email at all, only a pre-identity device id that just the
+    signup events link to the user.
+    """
+    customers = len(tenure)
+    ids = rng.integers(0, customers, n)
+    emails = customer_emails(ids)
+    anon = np.char.add("d", ids.astype(str)).astype(object)
+    devices = np.char.add("$device:", ids.astype(str)).astype(object)
+    kind = rng.random(n)
+    none = np.full(n, None, dtype=object)
+    return pd.DataFrame({
+        "event": PAYMENT_EVENT,
+        "time": (LAST_EVENT_TIME - rng.random(n) * tenure[ids] * MONTH_SECONDS).astype(np.int64),
+        "$email": np.where(kind < 0.60, emails, none),
+        "distinct_id": np.where((kind >= 0.75) & (kind < 0.85), emails, np.where(kind >= 0.85, devices, anon)),
+        "$distinct_id_before_identity": np.where((kind >= 0.60) & (kind < 0.75), emails, none),
+        "mp_country_code": COUNTRY_CODES[ids % len(COUNTRY_CODES)],
+    })
+
+
+def payment_mixpanel(rng: np.random.Generator, tenure: np.ndarray) -> pd.DataFrame:
+    """
+    One aggregate row per customer, plus 2% repeated rows the summary has
+    to fold. The all-time amount is a monthly spend over the customer's tenure.
+    """
+    customers = len(tenure)
+    ids = np.concatenate([np.arange(customers), rng.integers(0, customers, customers // 50)])
+    n = len(ids)
+    monthly = rng.lognormal(np.log(MONTHLY_SPEND_MEDIAN), MONTHLY_SPEND_SIGMA, n)
+    total = (monthly * tenure[ids]).round(0)
+    return pd.DataFrame({
+        "Email": customer_emails(ids),
+        "Phone Number": _phones(rng, n, junk_share=0.7),
+        "Phone Number Country": COUNTRY_CODES[rng.integers(0, len(COUNTRY_CODES), n)],
+        "Workspace": WORKSPACES[rng.integers(0, len(WORKSPACES), n)],
+        "A. Payment (all time)": total,
+        "B. Amount (Year)": (monthly * np.minimum(tenure[ids], 12) * rng.uniform(0.8, 1.2, n)).round(0),
+        "C. Amount (Month)": (monthly * rng.uniform(0.8, 1.2, n)).round(0),
+    })
+
+
+def pipedrive_contacts(rng: np.random.Generator, customers: int) -> pd.DataFrame:
+    """80% of customers plus 20% non-paying persons, with padded emails and 3% duplicates."""
+    ids = np.concatenate([
+        rng.choice(customers, int(customers * 0.8), replace=False),
+        np.arange(customers, customers + customers // 5),
+    ])
+    ids = np.concatenate([ids, rng.choice(ids, len(ids) * 3 // 100)])
+    n = len(ids)
+    emails = customer_emails(ids)
+    padded = rng.random(n) < 0.05
+    emails[padded] = np.char.add(" ", emails[padded].astype(str)).astype(object)
+    return pd.DataFrame({
+        "email": emails,
+        "full_name": "First Last",
+        "first_name": "First",
+        "last_name": "Last",
+        "phone": _phones(rng, n, junk_share=0.4),
+        "phone_country_name": COUNTRIES[rng.integers(0, len(COUNTRIES), n)],
+        "org": WORKSPACES[ids % len(WORKSPACES)],
+    })
+
+
+def unpaid_user(rng: np.random.Generator, customers: int, signups: int) -> pd.DataFrame:
+    """
+    Signups of mostly never-paying users; a quarter later became customers.
+    Each carries the user's Mixpanel id (the ``distinct_id`` of their
+    email-less payment events) and half a pre-identity device id, so
+    identity resolution has links to follow; 1% have a placeholder email.
+    """
+    ids = np.where(rng.random(signups) < 0.25, rng.integers(0, customers, signups),
+                   rng.integers(customers * 2, customers * 2 + signups, signups))
+    emails = customer_emails(ids)
+    emails[rng.random(signups) < 0.01] = "undefined"
+    devices = np.char.add("$device:", ids.astype(str)).astype(object)
+    return pd.DataFrame({
+        "$email": emails,
+        "distinct_id": np.char.add("d", ids.astype(str)).astype(object),
+        "$distinct_id_before_identity": np.where(rng.random(signups) < 0.5, devices, None),
+        "Phone Number": _phones(rng, signups, junk_share=0.5),
+        "Phone Number Country": COUNTRY_CODES[rng.integers(0, len(COUNTRY_CODES), signups)],
+    })
+
+
+def generate(events: int, out_dir: str, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Dict[str, str]:
+    """Write the four source CSVs for ``events`` payment events to ``out_dir``; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    customers = max(events // EVENTS_PER_CUSTOMER, 1)
+    tenure = customer_tenure(rng, customers)
+    paths = {name: os.path.join(out_dir, file) for name, file in FILES.items()}
+
+    for start in range(0, events, chunk_rows):
+        chunk = payment_api_chunk(rng, min(chunk_rows, events - start), tenure)
+        chunk.to_csv(paths["payment_api_export"], index=False, mode="w" if start == 0 else "a", header=start == 0)
+    payment_mixpanel(rng, tenure).to_csv(paths["payment_mixpanel_export"], index=False)
+    pipedrive_contacts(rng, customers).to_csv(paths["pipedrive_contacts"], index=False)
+    unpaid_user(rng, customers, max(events // 4, 1)).to_csv(paths["unpaid_user"], index=False)
+    return paths
+
+
+def dataset_name(scale: str, seed: int = 0) -> str:
+    return f"{scale}-seed{seed}-v{GENERATOR_VERSION}"
+
+
+def ensure_dataset(scale: str, data_dir: str, seed: int = 0) -> Dict[str, str]:
+    """Paths of the ``scale`` dataset under ``data_dir``, generating it on first use."""
+    out_dir = os.path.join(data_dir, dataset_name(scale, seed))
+    paths = {name: os.path.join(out_dir, file) for name, file in FILES.items()}
+    if not all(os.path.exists(p) for p in paths.values()):
+        paths = generate(SCALES[scale], out_dir, seed)
+    return paths
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic pipeline inputs.")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k", help="Number of payment API events")
+    parser.add_argument("--out", help="Output directory (default: benchmarks/data/<scale>-seed<seed>-v<version>)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    out_dir = args.out or os.path.join(os.path.dirname(__file__), "data", dataset_name(args.scale, args.seed))
+    for name, path in generate(SCALES[args.scale], out_dir, args.seed).items():
+        print(f"{name}: {path} ({os.path.getsize(path) / 2**20:.1f} MiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
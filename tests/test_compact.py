@@ -0,0 +1,15 @@
+"""Compact layout of the final dataset: smaller dtypes without losing monetary precision."""
+import pandas as pd
+
+from account_workflow.compact import compact_frame
+from account_workflow.tier_history import tier_snapshot
+
+
+def test_amount_per_month_keeps_cents():
+    df = pd.DataFrame({"Email": ["a@x.com", "b@x.com"], "Tier": ["VIP", "Gold"],
+                       "Amount_per_month": [123456.78, 9876543.21], "Duration_Months": [3, 40]})
+    compact = compact_frame(df)
+    assert compact["Amount_per_month"].dtype == "float64"
+    assert compact["Amount_per_month"].round(2).tolist() == [123456.78, 9876543.21]
+    assert compact["Duration_Months"].dtype == "int16"
+    assert tier_snapshot(compact)["Amount_per_month"].tolist() == [123456.78, 9876543.21]
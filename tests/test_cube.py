@@ -0,0 +1,83 @@
+"""Analytics cube: grouped quantiles and roll-ups match direct pandas aggregations."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from account_workflow.cube import QUANTILES, REVENUE_SUMS, _group_quantiles, build_cube, query_cube
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_group_quantiles_match_groupby_quantile(seed):
+    rng = np.random.default_rng(seed)
+    n, ngroups = int(rng.integers(0, 60)), int(rng.integers(1, 12))
+    # some groups get no rows or a single row; some values are NaN, some whole groups all NaN
+    codes = rng.integers(0, ngroups, n) // rng.choice([1, 2], n)
+    values = rng.gamma(2, 50, n).round(rng.choice([0, 2]))
+    values[rng.random(n) < 0.2] = np.nan
+    values[codes == 0] = np.nan
+    order = np.argsort(values, kind="stable")  # NaN sort last
+    codes, values = codes[order], values[order]
+
+    result = _group_quantiles(codes, ngroups, values)
+    grouped = pd.Series(values).groupby(codes)
+    for name, q in QUANTILES.items():
+        expected = grouped.quantile(q).reindex(range(ngroups)).to_numpy()
+        np.testing.assert_allclose(result[name], expected, equal_nan=True)
+
+
+def final_dataset(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    amount = rng.gamma(2, 50, n)
+    amount[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        "Tier": rng.choice(["VIP", "Gold", "Bronze"], n),
+        "Workspace": rng.choice(["A", "B", "C", None], n),
+        "Phone_Country": rng.choice(["India", "Germany"], n),
+        "First_Payment": pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+        "Amount_per_month": amount,
+        **{column: rng.integers(0, 1000, n).astype(float) for column in REVENUE_SUMS.values()},
+    })
+
+
+def direct(frame, by):
+    grouped = frame.groupby(by, dropna=False)
+    expected = grouped.agg(Customers=("Amount_per_month", "size"),
+                           **{m: (c, "sum") for m, c in REVENUE_SUMS.items()})
+    for name, q in QUANTILES.items():
+        expected[name] = grouped["Amount_per_month"].quantile(q)
+    return expected.round(2)
+
+
+def test_cube_groups_match_groupby():
+    final = final_dataset()
+    cube = build_cube(final)
+    got = query_cube(cube, by=["Tier", "Workspace"])
+    got = got.astype({"Tier": object, "Workspace": object}).set_index(["Tier", "Workspace"]).sort_index()
+    pd.testing.assert_frame_equal(got, direct(final, ["Tier", "Workspace"]).sort_index(),
+                                  check_dtype=False, check_index_type=False)
+
+    total = query_cube(cube)
+    assert total["Customers"].tolist() == [len(final)]
+    assert total["Amount_p50"].iloc[0] == round(final["Amount_per_month"].median(), 2)
+
+
+def test_query_cube_rolls_up_several_filter_values():
+    final = final_dataset()
+    cube = build_cube(final)
+    got = query_cube(cube, by=["Tier"], filters={"Workspace": ["A", "B"], "Phone_Country": ["India"]})
+    subset = final[final["Workspace"].isin(["A", "B"]) & (final["Phone_Country"] == "India")]
+    expected = direct(subset, ["Tier"])
+    got = got.astype({"Tier": object}).set_index("Tier").sort_index()
+    additive = ["Customers"] + list(REVENUE_SUMS)
+    pd.testing.assert_frame_equal(got[additive], expected[additive].sort_index(),
+                                  check_dtype=False, check_index_type=False)
+    # quantiles do not add up over several values
+    assert got[list(QUANTILES)].isna().all().all()
+
+    overall = query_cube(cube, filters={"Workspace": ["A", "B"]})
+    assert overall["Customers"].tolist() == [final["Workspace"].isin(["A", "B"]).sum()]
+
+    single = query_cube(cube, by=["Tier"], filters={"Workspace": ["A"]})
+    single = single.astype({"Tier": object}).set_index("Tier").sort_index()
+    pd.testing.assert_frame_equal(single, direct(final[final["Workspace"] == "A"], ["Tier"]).sort_index(),
+                                  check_dtype=False, check_index_type=False)
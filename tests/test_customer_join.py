@@ -0,0 +1,61 @@
+"""join_on_email gives the same frame as the drop_duplicates + chained pd.merge flow it replaced."""
+import numpy as np
+import pandas as pd
+
+from account_workflow.customer_join import join_on_email
+
+
+def merge_chain(base, sources, key="Email"):
+    """The original flow: deduplicate every frame on the key, then left merge each source in turn."""
+    merged = base.drop_duplicates(key)
+    for df, columns in sources:
+        columns = [c for c in (columns or df.columns) if c != key and c not in merged.columns]
+        if columns:
+            merged = pd.merge(merged, df.drop_duplicates(key)[[key] + columns], on=key, how="left")
+    return merged.reset_index(drop=True)
+
+
+BASE = pd.DataFrame({
+    "Email": ["a@x.com", "b@x.com", "a@x.com", np.nan, "c@x.com", "d@x.com"],
+    "Amount": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+})
+CONTACTS = pd.DataFrame({
+    "Email": ["b@x.com", "a@x.com", "b@x.com", np.nan, "e@x.com"],  # no c@ or d@, an extra e@
+    "Full_Name": ["Bob", "Ann", "Bob again", "Nobody", "Eve"],
+    "Amount": [9.0, 9.0, 9.0, 9.0, 9.0],  # already in base: not taken
+})
+PAYMENTS = pd.DataFrame({
+    "Email": ["c@x.com", "a@x.com", "a@x.com"],  # no b@ or d@
+    "Event_Count": np.array([7, 8, 9], dtype=np.int64),  # upcast to float by the missing rows
+    "First_Payment": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]),
+    "Full_Name": ["x", "y", "z"],  # already taken from CONTACTS
+})
+SOURCES = [(CONTACTS, ["Full_Name", "Amount"]), (PAYMENTS, None)]
+
+
+def test_matches_merge_chain():
+    expected = merge_chain(BASE, SOURCES)
+    joined = join_on_email(BASE, SOURCES)
+    pd.testing.assert_frame_equal(joined, expected)
+    assert joined["Event_Count"].dtype == "float64"
+    assert joined["Full_Name"].tolist()[:2] == ["Ann", "Bob"]
+
+
+def test_columns_restrict_and_order_output():
+    columns = ["First_Payment", "Email", "Full_Name", "Missing"]
+    joined = join_on_email(BASE, SOURCES, columns=columns)
+    pd.testing.assert_frame_equal(joined, merge_chain(BASE, SOURCES)[["First_Payment", "Email", "Full_Name"]])
+
+
+def test_random_frames_match_merge_chain():
+    rng = np.random.default_rng(0)
+    emails = np.array([f"u{i}@x.com" for i in range(50)] + [np.nan], dtype=object)
+
+    def frame(n, **columns):
+        return pd.DataFrame({"Email": rng.choice(emails, n), **{c: make(n) for c, make in columns.items()}})
+
+    base = frame(80, Amount=lambda n: rng.random(n))
+    contacts = frame(60, Full_Name=lambda n: rng.choice(["Ann", "Bob", None], n))
+    counts = frame(40, Event_Count=lambda n: rng.integers(0, 100, n))
+    sources = [(contacts, None), (counts, ["Event_Count"])]
+    pd.testing.assert_frame_equal(join_on_email(base, sources), merge_chain(base, sources))
@@ -0,0 +1,71 @@
+"""Event store syncs: missing days fetched as multi-day ranges and stored per day."""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from account_workflow.event_store import EventStore, fetch_ranges, split_days
+from account_workflow.mixpanel import PAYMENT_EVENT, PAYMENT_PROPERTIES
+from account_workflow.pipeline import event_fetcher
+from conftest import send
+from test_mixpanel import export_body
+
+TODAY = date(2025, 10, 1)
+
+
+def test_fetch_ranges_groups_consecutive_days():
+    days = [date(2025, 8, d) for d in [1, 2, 3, 5, 6, 7, 8, 9, 10, 11, 12, 13, 20]]
+    assert fetch_ranges(days, 7) == [
+        (date(2025, 8, 1), date(2025, 8, 3)),
+        (date(2025, 8, 5), date(2025, 8, 11)),
+        (date(2025, 8, 12), date(2025, 8, 13)),
+        (date(2025, 8, 20), date(2025, 8, 20)),
+    ]
+
+
+def test_split_days_by_time():
+    start = date(2025, 8, 1)
+    noon = int(pd.Timestamp(start).timestamp()) + 12 * 3600
+    df = pd.DataFrame({"time": [noon, noon + 86_400, noon - 86_400, None, noon + 10 * 86_400], "n": range(5)})
+    parts = dict(split_days(df, start, start + timedelta(days=2)))
+    assert [len(p) for p in parts.values()] == [3, 1, 1]
+    assert parts[start]["n"].tolist() == [0, 2, 3]  # in range, before the range, no time
+    assert parts[date(2025, 8, 3)]["n"].tolist() == [4]  # after the range
+
+
+def sync(store, fake_api, from_date, to_date, today=TODAY):
+    fetch = event_fetcher(PAYMENT_EVENT, PAYMENT_PROPERTIES, api_key="k", project_id="1",
+                          base_url=fake_api.url + "/export")
+    return store.sync(PAYMENT_EVENT, from_date, to_date, fetch, today=today)
+
+
+def test_cold_sync_fetches_weekly_ranges(tmp_path, fake_api):
+    fake_api.respond = lambda handler, path, query: send(handler, 200, export_body(query))
+    store = EventStore(tmp_path)
+    fetched = sync(store, fake_api, date(2025, 8, 1), date(2025, 8, 31))
+    assert len(fetched) == 31
+    assert len(fake_api.requests) == 5  # 31 days in week-long ranges, not one request per day
+    assert store.stored_days(PAYMENT_EVENT) == fetched
+    for day in fetched:
+        df = pd.read_parquet(store.partition_path(PAYMENT_EVENT, day))
+        assert len(df) == 3
+        assert (pd.to_datetime(df["time"], unit="s").dt.date == day).all()
+    assert len(store.read_days(PAYMENT_EVENT, date(2025, 8, 1), date(2025, 8, 31))) == 93
+
+
+def test_warm_sync_fetches_gaps_and_hot_days(tmp_path, fake_api):
+    fake_api.respond = lambda handler, path, query: send(handler, 200, export_body(query))
+    store = EventStore(tmp_path, hot_days=3)
+    sync(store, fake_api, date(2025, 8, 1), date(2025, 8, 31))
+    store.invalidate(PAYMENT_EVENT, date(2025, 8, 10))
+    store.invalidate(PAYMENT_EVENT, date(2025, 8, 11))
+    fake_api.requests.clear()
+    # today decides the hot window: the last three days are fetched again
+    fetched = sync(store, fake_api, date(2025, 8, 1), date(2025, 8, 31), today=date(2025, 8, 31))
+    assert fetched == [date(2025, 8, 10), date(2025, 8, 11), date(2025, 8, 28), date(2025, 8, 29),
+                       date(2025, 8, 30), date(2025, 8, 31)]
+    assert sorted((q["from_date"], q["to_date"]) for _, q in fake_api.requests) == [
+        ("2025-08-10", "2025-08-11"), ("2025-08-28", "2025-08-31"),
+    ]
+    fake_api.requests.clear()
+    assert sync(store, fake_api, date(2025, 8, 1), date(2025, 8, 31)) == []
+    assert fake_api.requests == []
@@ -0,0 +1,73 @@
+"""Chunked exports write what a single to_csv / to_parquet would."""
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from account_workflow.export import export_bytes, export_format, write_csv, write_export, write_tier_files
+from account_workflow.tiers import TIER_DTYPE
+
+
+def final(n=7):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Email": [f"u{i}@x.com" for i in range(n)],
+        "Full_Name": rng.choice(["Ann, Jr.", 'Bo "B"', "Çelik", None], n),
+        "First_Payment": pd.to_datetime("2025-01-01") + pd.to_timedelta(np.arange(n), unit="D"),
+        "Amount_per_month": rng.random(n) * 100,
+        "Tier": pd.Categorical(rng.choice(["Gold", "VIP", "Bronze"], n), dtype=TIER_DTYPE),
+    })
+
+
+@pytest.mark.parametrize("rows", [1, 2, 3, 7, 100])
+def test_write_csv_matches_to_csv(rows):
+    df = final()
+    f = io.BytesIO()
+    write_csv(df, f, rows)
+    assert f.getvalue() == df.to_csv(index=False).encode("utf-8")
+    assert gzip.decompress(export_bytes(df, "csv.gz")) == f.getvalue()
+
+
+def test_empty_frame_keeps_header():
+    df = final().iloc[:0]
+    f = io.BytesIO()
+    write_csv(df, f, 2)
+    assert f.getvalue() == b"Email,Full_Name,First_Payment,Amount_per_month,Tier\n"
+    assert pd.read_parquet(io.BytesIO(export_bytes(df, "parquet"))).columns.tolist() == df.columns.tolist()
+
+
+def test_parquet_round_trip_keeps_tier_order():
+    df = final()
+    f = io.BytesIO()
+    write_export(df, f, "parquet", rows=3)
+    back = pd.read_parquet(io.BytesIO(f.getvalue()))
+    assert back["Tier"].dtype == TIER_DTYPE
+    pd.testing.assert_frame_equal(back, df, check_dtype=False)
+    assert back["Tier"].min() == "VIP"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "parquet"])
+def test_tier_zip_members(fmt, tmp_path):
+    df = final()
+    with zipfile.ZipFile(io.BytesIO(export_bytes(df, fmt, by_tier=True, stem="out"))) as archive:
+        names = archive.namelist()
+        assert names == [f"out_{tier}.{fmt}" for tier in ["VIP", "Gold", "Bronze"]]
+        member = archive.read(f"out_Gold.{fmt}")
+    gold = df[df["Tier"] == "Gold"]
+    if fmt == "csv":
+        assert member == gold.to_csv(index=False).encode("utf-8")
+    elif fmt == "parquet":
+        assert len(pd.read_parquet(io.BytesIO(member))) == len(gold)
+
+    paths = write_tier_files(df, str(tmp_path), fmt, stem="out")
+    assert [p.rsplit("/", 1)[1] for p in paths] == names
+
+
+def test_export_format():
+    assert export_format("out.CSV.GZ") == "csv.gz"
+    assert export_format("dir/out.parquet") == "parquet"
+    with pytest.raises(ValueError, match="xlsx"):
+        export_format("out.xlsx")
@@ -0,0 +1,73 @@
+"""Identity resolution: ids linked to exactly one email through shared events."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from account_workflow.identity import build_identity_map, connected_components, identity_pairs
+from account_workflow.payments import email_attribution
+
+
+def reference_components(a, b, n):
+    """Plain union-find, labelling every node with the smallest node of its component."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for x, y in zip(a, b):
+        rx, ry = find(x), find(y)
+        if rx != ry:
+            parent[max(rx, ry)] = min(rx, ry)
+    return np.array([find(x) for x in range(n)])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_connected_components_match_union_find(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 200))
+    edges = int(rng.integers(0, 2 * n))
+    a, b = rng.integers(0, n, edges), rng.integers(0, n, edges)
+    np.testing.assert_array_equal(connected_components(a, b, n), reference_components(a, b, n))
+
+
+def events(*rows):
+    return pd.DataFrame(rows, columns=["$email", "distinct_id", "$distinct_id_before_identity"])
+
+
+EVENTS = events(
+    ("a@x.com", "d1", None),
+    (None, "d2", "d1"),  # d2 reaches a@x.com through d1
+    ("b@x.com", "d3", None),
+    ("c@x.com", "d4", None),
+    ("b@x.com", "d4", None),  # d4 is shared by two emails
+    (None, "d5", None),  # no email at all
+)
+
+
+def test_ids_linked_to_one_email_only():
+    identity_map = build_identity_map([EVENTS])
+    assert identity_map.to_dict() == {"d1": "a@x.com", "d2": "a@x.com"}
+
+
+def test_chunks_give_the_same_map():
+    chunked = build_identity_map([EVENTS.iloc[i:i + 2] for i in range(0, len(EVENTS), 2)])
+    pd.testing.assert_series_equal(chunked.sort_index(), build_identity_map([EVENTS]).sort_index())
+
+
+@pytest.mark.parametrize("placeholder", ["undefined", "None", "nan", ""])
+def test_placeholders_are_not_identities(placeholder):
+    with_placeholders = pd.concat([EVENTS, events((placeholder, "d1", None), (placeholder, "d3", placeholder))])
+    assert not identity_pairs(with_placeholders).isin([placeholder]).any().any()
+    assert build_identity_map([with_placeholders]).to_dict() == {"d1": "a@x.com", "d2": "a@x.com"}
+
+
+def test_email_attribution_counts_newly_attributed():
+    pay = EVENTS.assign(time=1722513600)
+    counts = email_attribution(pay, build_identity_map([EVENTS]))
+    # d2 is attributed through the map; the d5 event stays unattributed
+    assert counts.to_dict("records") == [{"With_Email": 4, "Newly_Attributed": 1, "Unattributed": 1}]
+    chunks = email_attribution([pay.iloc[:3], pay.iloc[3:]], build_identity_map([EVENTS]))
+    pd.testing.assert_frame_equal(chunks, counts)
@@ -0,0 +1,57 @@
+"""Schema-driven CSV reads: text columns keep their exact values with either reader."""
+import io
+
+import pandas as pd
+
+from account_workflow.ingest import PAYMENT_API, PIPEDRIVE_CONTACTS, read_source, read_source_chunks
+from account_workflow.pipeline import reduce_payment_chunks
+
+CONTACTS = (
+    b"Email, full_name,Phone,Phone_Country_Name,Extra\n"
+    b"a@x.com,Ann,07911123456,United Kingdom,1\n"
+    b"b@x.com,Bob,+447911123456,United Kingdom,2\n"
+    b"c@x.com,Cy,0044,,3\n"
+    b"d@x.com,,,Germany,4\n"
+    b"e@x.com,NA,4915112345678,Germany,5\n"
+)
+
+
+def test_phones_keep_leading_zeros_and_plus():
+    df = read_source(io.BytesIO(CONTACTS), PIPEDRIVE_CONTACTS)
+    assert list(df.columns) == list(PIPEDRIVE_CONTACTS.columns)
+    assert df["Phone"].tolist()[:3] == ["07911123456", "+447911123456", "0044"]
+    assert df["Phone"].isna().tolist() == [False, False, False, True, False]
+    assert df["Phone"].iloc[4] == "4915112345678"
+    assert df["Full_Name"].isna().tolist() == [False, False, False, True, True]
+    assert isinstance(df["Phone_Country_Name"].dtype, pd.CategoricalDtype)
+
+
+def test_chunked_read_matches_whole_read():
+    whole = read_source(io.BytesIO(CONTACTS), PIPEDRIVE_CONTACTS)
+    chunked = pd.concat(read_source_chunks(io.BytesIO(CONTACTS), PIPEDRIVE_CONTACTS, chunk_rows=2), ignore_index=True)
+    # chunks carry their own category sets, so concat falls back to plain strings
+    pd.testing.assert_frame_equal(whole, chunked, check_dtype=False, check_categorical=False)
+
+
+def test_file_object_can_be_read_again():
+    source = io.BytesIO(CONTACTS)
+    first = pd.concat(read_source_chunks(source, PIPEDRIVE_CONTACTS, chunk_rows=2), ignore_index=True)
+    second = pd.concat(read_source_chunks(source, PIPEDRIVE_CONTACTS, chunk_rows=2), ignore_index=True)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(read_source(source, PIPEDRIVE_CONTACTS)) == 5
+
+
+def test_payment_chunks_reread_from_one_upload():
+    payments = io.BytesIO(
+        b"time,$email,distinct_id,$distinct_id_before_identity\n"
+        b"1722513600,a@x.com,d1,\n"
+        b"1722600000,,d1,\n"
+        b"1722686400,b@x.com,d2,\n"
+    )
+    unpaid = pd.DataFrame({"$email": ["c@x.com"], "distinct_id": ["d3"]})
+    pay1, attribution = reduce_payment_chunks(
+        lambda: read_source_chunks(payments, PAYMENT_API, chunk_rows=1), unpaid, today=pd.Timestamp("2024-09-01"))
+    assert sorted(pay1["Email"]) == ["a@x.com", "b@x.com"]
+    # the second event reaches a@x.com through d1, linked on the identity pass
+    assert pay1.set_index("Email").loc["a@x.com", "Last_Payment"] == pd.Timestamp("2024-08-02")
+    assert attribution["Newly_Attributed"].tolist() == [1]
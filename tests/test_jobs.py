@@ -0,0 +1,86 @@
+"""Background jobs: persisted results, joined duplicate runs and runs cut off by a restart."""
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+from account_workflow.jobs import JobRunner, JobStore
+
+
+def wait_until_finished(runner: JobRunner, job_id: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = runner.get(job_id)
+        if status["state"] not in ("queued", "running"):
+            return status
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_result_round_trip(tmp_path):
+    store = JobStore(tmp_path)
+    frame = pd.DataFrame({"Email": ["a@x.com", None], "Amount": [1.5, 2.0]})
+    result = {"final_merged": frame, "tier_previous_day": date(2025, 8, 31), "report_path": None,
+              "rows": 2, "report": {"stages": [{"stage": "Read", "seconds": 0.1}]}}
+    store.save_result("job1", result)
+    loaded = store.load_result("job1")
+    assert loaded.keys() == result.keys()
+    pd.testing.assert_frame_equal(loaded.pop("final_merged"), frame)
+    assert loaded == {k: v for k, v in result.items() if k != "final_merged"}
+
+
+def test_duplicate_submission_joins_the_running_job(tmp_path):
+    runner = JobRunner(JobStore(tmp_path))
+    release = threading.Event()
+    calls = []
+
+    def job(value, *, stage_hook, notify):
+        calls.append(value)
+        with stage_hook("Work"):
+            release.wait(5)
+            notify("halfway", "status")
+        return {"value": value}
+
+    first = runner.submit(job, 1, params={"value": 1}, signature="same")
+    assert runner.submit(job, 1, signature="same") == first
+    assert runner.submit(job, 2, signature="other") != first
+    release.set()
+    status = wait_until_finished(runner, first)
+    assert status["state"] == "done" and status["params"] == {"value": 1}
+    assert [e["message"] for e in status["events"]] == ["Work done."]
+    assert runner.load_result(first) == {"value": 1}
+
+    # once finished, the same signature starts a new run
+    second = runner.submit(job, 1, signature="same")
+    assert second != first
+    wait_until_finished(runner, second)
+    assert sorted(calls) == [1, 1, 2]
+
+
+def test_failed_job_keeps_the_stage_error(tmp_path):
+    runner = JobRunner(JobStore(tmp_path))
+
+    def job(*, stage_hook, notify):
+        with stage_hook("Fetch"):
+            raise RuntimeError("rate limited")
+
+    status = wait_until_finished(runner, runner.submit(job))
+    assert status["state"] == "failed"
+    assert status["error"] == "Fetch failed: rate limited"
+
+
+def test_unfinished_job_from_before_a_restart_is_interrupted(tmp_path):
+    store = JobStore(tmp_path)
+    for job_id, state in [("queued1", "queued"), ("running1", "running"), ("done1", "done")]:
+        store.write_status({"id": job_id, "state": state, "submitted": f"2025-08-31T10:00:0{len(job_id)}",
+                            "stage": "Fetch", "message": "Shard 1/4", "events": []})
+
+    restarted = JobRunner(store)
+    assert restarted.get("queued1")["state"] == "interrupted"
+    assert restarted.get("running1")["state"] == "interrupted"
+    assert restarted.get("done1")["state"] == "done"
+    assert restarted.get("unknown") is None
+    # the new state is stored, so every later reader sees it too
+    assert store.status("running1")["state"] == "interrupted"
+    assert store.status("running1")["stage"] is None
@@ -0,0 +1,148 @@
+"""NDJSON parsing and the sharded export fetch, against a local fake export endpoint."""
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from account_workflow import mixpanel
+from account_workflow.mixpanel import (
+    MixpanelExportError,
+    fetch_mixpanel_event,
+    fetch_mixpanel_event_sharded,
+    parse_ndjson,
+)
+from conftest import send
+
+PROPERTIES = ["time", "$email", "distinct_id"]
+
+
+def event_line(day: date, i: int) -> bytes:
+    time = int(datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc).timestamp()) + i
+    event = {"event": "New Payment Made",
+             "properties": {"time": time, "$email": f"u{i}@x.com" if i else None, "distinct_id": f"d{i}", "extra": {"a": 1}}}
+    return json.dumps(event).encode() + b"\n"
+
+
+def export_body(query) -> bytes:
+    day, end = date.fromisoformat(query["from_date"]), date.fromisoformat(query["to_date"])
+    lines = []
+    while day <= end:
+        lines += [event_line(day, i) for i in range(3)]
+        day += timedelta(days=1)
+    return b"".join(lines)
+
+
+def test_parse_ndjson_projects_properties():
+    lines = [event_line(date(2025, 8, 1), i) for i in range(5)] + [b"", b"  "]
+    df = parse_ndjson(lines, PROPERTIES, chunk_rows=2)
+    assert list(df.columns) == ["event"] + PROPERTIES
+    assert len(df) == 5
+    assert df["$email"].isna().tolist() == [True, False, False, False, False]
+    assert df["$email"].iloc[1:].tolist() == ["u1@x.com", "u2@x.com", "u3@x.com", "u4@x.com"]
+
+
+def test_parse_ndjson_flattens_without_properties():
+    df = parse_ndjson([event_line(date(2025, 8, 1), 1).decode()])
+    assert {"event", "time", "$email", "distinct_id", "extra.a"} <= set(df.columns)
+
+
+def test_parse_ndjson_last_line_without_newline():
+    lines = event_line(date(2025, 8, 1), 1) + event_line(date(2025, 8, 1), 2).rstrip(b"\n")
+    assert len(parse_ndjson(lines.splitlines(), PROPERTIES)) == 2
+
+
+def test_parse_ndjson_rejects_partial_line():
+    partial = event_line(date(2025, 8, 1), 1)[:25]
+    with pytest.raises(ValueError):
+        parse_ndjson([event_line(date(2025, 8, 1), 0), partial], PROPERTIES)
+
+
+def test_parse_ndjson_empty():
+    assert list(parse_ndjson([], PROPERTIES).columns) == ["event"] + PROPERTIES
+
+
+def test_fetch_event(fake_api):
+    fake_api.respond = lambda handler, path, query: send(handler, 200, export_body(query))
+    df = fetch_mixpanel_event("New Payment Made", "2025-08-01", "2025-08-02", api_key="k", project_id="1",
+                              properties=PROPERTIES, base_url=fake_api.url + "/export")
+    assert len(df) == 6
+    path, query = fake_api.requests[0]
+    assert json.loads(query["event"]) == ["New Payment Made"]
+    assert query["project_id"] == "1"
+
+
+def test_fetch_event_error_status(fake_api):
+    fake_api.respond = lambda handler, path, query: send(handler, 400, b"bad request")
+    with pytest.raises(MixpanelExportError) as error:
+        fetch_mixpanel_event("New Payment Made", "2025-08-01", "2025-08-01", api_key="k", project_id="1",
+                             base_url=fake_api.url + "/export")
+    assert error.value.status_code == 400
+
+
+def test_sharded_fetch_retries_rate_limit(fake_api):
+    limited = set()
+
+    def respond(handler, path, query):
+        shard = (query["from_date"], query["to_date"])
+        if shard not in limited:
+            limited.add(shard)
+            send(handler, 429, b"rate limited")
+        else:
+            send(handler, 200, export_body(query))
+
+    fake_api.respond = respond
+    df = fetch_mixpanel_event_sharded("New Payment Made", date(2025, 8, 1), date(2025, 8, 10), shard="week",
+                                      api_key="k", project_id="1", properties=PROPERTIES,
+                                      base_url=fake_api.url + "/export", backoff=0.01)
+    assert len(fake_api.requests) == 4  # two week shards, each rate limited once
+    assert len(df) == 30
+    times = pd.to_datetime(df["time"], unit="s")
+    assert times.is_monotonic_increasing
+
+
+def test_sharded_fetch_waits_retry_after(fake_api, monkeypatch):
+    waits = []
+    monkeypatch.setattr(mixpanel.time, "sleep", waits.append)
+
+    def respond(handler, path, query):
+        if len(fake_api.requests) == 1:
+            send(handler, 429, b"rate limited", {"Retry-After": "42"})
+        elif len(fake_api.requests) == 2:
+            send(handler, 503, b"unavailable")
+        else:
+            send(handler, 200, export_body(query))
+
+    fake_api.respond = respond
+    df = fetch_mixpanel_event_sharded("New Payment Made", date(2025, 8, 1), date(2025, 8, 3), shard="week",
+                                      api_key="k", project_id="1", properties=PROPERTIES,
+                                      base_url=fake_api.url + "/export", backoff=0.5)
+    assert len(df) == 9
+    # Retry-After is honoured; without one the backoff schedule applies
+    assert waits == [42.0, 1.0]
+
+
+def test_sharded_fetch_retries_truncated_stream(fake_api):
+    attempts = []
+
+    def respond(handler, path, query):
+        attempts.append(query)
+        body = export_body(query)
+        if len(attempts) == 1:
+            # the connection drops partway through a chunk, mid-line
+            handler.send_response(200)
+            handler.send_header("Transfer-Encoding", "chunked")
+            handler.send_header("Connection", "close")
+            handler.end_headers()
+            handler.wfile.write(b"%x\r\n" % len(body) + body[: len(body) // 2])
+            handler.wfile.flush()
+            handler.close_connection = True
+        else:
+            send(handler, 200, body)
+
+    fake_api.respond = respond
+    df = fetch_mixpanel_event_sharded("New Payment Made", date(2025, 8, 1), date(2025, 8, 3), shard="week",
+                                      api_key="k", project_id="1", properties=PROPERTIES,
+                                      base_url=fake_api.url + "/export", backoff=0.01)
+    assert len(attempts) == 2
+    assert len(df) == 9
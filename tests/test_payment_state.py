@@ -0,0 +1,45 @@
+"""Incremental payment state: settled days are folded in once, with the watermark stored atomically."""
+import json
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from account_workflow.payment_state import load_payment_state, save_payment_state, update_payment_state
+
+
+def events(*days_emails):
+    return pd.DataFrame({
+        "time": [int(datetime(d.year, d.month, d.day, 12, tzinfo=timezone.utc).timestamp()) for d, _ in days_emails],
+        "$email": [e for _, e in days_emails],
+        "distinct_id": ["x"] * len(days_emails),
+        "$distinct_id_before_identity": [None] * len(days_emails),
+    })
+
+
+def test_round_trip_keeps_watermark_in_parquet(tmp_path):
+    state = pd.DataFrame({"Email": ["a@x.com"], "First_Payment": [pd.Timestamp("2025-08-01")],
+                          "Last_Payment": [pd.Timestamp("2025-08-02")], "Event_Count": [2]})
+    save_payment_state(tmp_path, state, date(2025, 8, 2))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["state.parquet"]
+    loaded, settled = load_payment_state(tmp_path)
+    assert settled == date(2025, 8, 2)
+    assert loaded["Event_Count"].tolist() == [2]
+
+
+def test_stale_meta_json_is_ignored(tmp_path):
+    # a crash used to leave new aggregates next to an older meta.json
+    save_payment_state(tmp_path, load_payment_state(tmp_path)[0], date(2025, 8, 10))
+    (tmp_path / "meta.json").write_text(json.dumps({"settled_through": "2025-08-01"}))
+    assert load_payment_state(tmp_path)[1] == date(2025, 8, 10)
+
+
+def test_settled_days_are_counted_once(tmp_path):
+    fetched = events((date(2025, 8, 1), "a@x.com"), (date(2025, 8, 2), "a@x.com"), (date(2025, 8, 5), "a@x.com"))
+    kwargs = dict(from_date=date(2025, 8, 1), to_date=date(2025, 8, 5), settle_before=date(2025, 8, 4))
+    first, settled = update_payment_state(tmp_path, fetched, **kwargs)
+    assert settled == date(2025, 8, 3)
+    assert first["Event_Count"].tolist() == [3]
+    # the same fetch again: settled days are skipped, the hot day is merged but not stored
+    again, _ = update_payment_state(tmp_path, fetched, **kwargs)
+    assert again["Event_Count"].tolist() == [3]
+    assert load_payment_state(tmp_path)[0]["Event_Count"].tolist() == [2]
@@ -0,0 +1,79 @@
+"""Equivalence of the vectorized payment helpers with the row-wise code they replaced in app.py."""
+from math import ceil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from account_workflow.payments import months_since_first, payment_event_dates, resolve_emails
+
+
+def original_email(x):
+    return (
+        x["$email"]
+        if "@" in str(x["$email"])
+        else (
+            x["$distinct_id_before_identity"]
+            if "@" in str(x["$distinct_id_before_identity"])
+            else (
+                x["distinct_id"]
+                if "@" in str(x["distinct_id"])
+                else None
+            )
+        )
+    )
+
+
+def original_months_since_first(date, today):
+    delta_years = today.year - date.year
+    delta_months = today.month - date.month
+    delta_days = today.day - date.day
+    total_months = delta_years * 12 + delta_months + delta_days / 30
+    return ceil(total_months)
+
+
+@pytest.fixture
+def events():
+    return pd.DataFrame({
+        "time": [1_700_000_000 + i * 86_400 for i in range(8)],
+        "$email": ["a@x.com", np.nan, "undefined", None, "", "b@x.com", "undefined", np.nan],
+        "$distinct_id_before_identity": [np.nan, "c@x.com", "undefined", "d@x.com", np.nan, "e@x.com", "123", None],
+        "distinct_id": ["1", "f@x.com", "g@x.com", "h@x.com", "2", np.nan, "undefined", 3],
+    })
+
+
+def test_resolve_emails_matches_row_wise(events):
+    expected = events.apply(original_email, axis=1)
+    assert resolve_emails(events).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("missing", ["$email", "distinct_id", "$distinct_id_before_identity"])
+def test_missing_identity_column(events, missing):
+    partial = events.drop(columns=missing)
+    # the apps add missing columns as all-NA before resolving
+    expected = partial.assign(**{missing: pd.NA}).apply(original_email, axis=1)
+    resolved = payment_event_dates(partial)
+    assert resolved["Email"].tolist() == expected.dropna().tolist()
+
+
+@pytest.mark.parametrize("today", [
+    "2025-08-31",  # month end
+    "2025-02-28",  # short month end
+    "2025-03-01",  # first of month
+    "2025-08-15",  # mid month
+])
+def test_months_since_first_matches_row_wise(today):
+    today = pd.Timestamp(today)
+    first = pd.Series(pd.to_datetime([
+        "2025-08-01", "2025-08-15", "2025-08-31",  # same month as some of the todays
+        "2025-01-31", "2024-02-29", "2024-12-31", "2023-03-01", "2025-07-31",
+    ]))
+    expected = [original_months_since_first(d, today) for d in first]
+    result = months_since_first(first, today)
+    assert result.tolist() == expected
+    assert result.dtype == np.int64
+
+
+def test_months_since_first_missing_date_is_zero():
+    result = months_since_first(pd.Series([pd.NaT, pd.Timestamp("2025-01-01")]), pd.Timestamp("2025-03-01"))
+    assert result.tolist() == [0, 2]
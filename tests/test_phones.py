@@ -0,0 +1,43 @@
+"""Country detection over phone columns."""
+import pandas as pd
+
+from account_workflow.phones import UNDEFINED_VALUES, combine_phone_columns, detect_countries, normalize_phone, normalize_phones
+
+
+def test_detect_countries():
+    phones = pd.Series(["+447400123456", None, "+4915112345678", "+447400123456", "123"], index=[5, 6, 7, 8, 9])
+    countries = detect_countries(phones)
+    assert countries.index.tolist() == [5, 6, 7, 8, 9]
+    assert countries[5] == countries[8] == "United Kingdom"
+    assert countries[7] == "Germany"
+    assert countries[[6, 9]].isna().all()
+
+
+def test_detect_countries_all_missing():
+    phones = pd.Series([None, pd.NA, float("nan")], index=[3, 4, 5], dtype=object)
+    countries = detect_countries(phones)
+    assert countries.index.tolist() == [3, 4, 5]
+    assert countries.isna().all()
+    assert detect_countries(pd.Series([], dtype=object)).empty
+
+
+def test_normalize_phones_matches_normalize_phone():
+    raw = ["++918521225200", " +91 8521-225-200 ", "0044 20 7183", "tel: 555-0100", "abc", "12+34", "", None, "undefined"]
+    normalized = normalize_phones(pd.Series(raw, dtype=object))
+    expected = [normalize_phone(v) if v not in UNDEFINED_VALUES else None for v in raw]
+    assert [None if pd.isna(v) else v for v in normalized] == expected
+    assert expected[:6] == ["+918521225200", "+918521225200", "0044207183", "5550100", None, "1234"]
+
+
+def test_combine_phone_columns():
+    df = pd.DataFrame({
+        "Phone Number": ["undefined", " +44 7400-123-456 ", "++4915112345678", None],
+        "Phone Number Country": ["undefined", None, None, "India"],
+        "Phone": ["+447400123456", "+4915112345678", None, None],
+        "Phone_Country_Name": [None, "Germany", " Germany ", None],
+    })
+    combined = combine_phone_columns(df)
+    # Mixpanel's number first, digit-normalized; Pipedrive's country first, detected when neither has one
+    assert combined["Phone_Number"].tolist()[:3] == ["+447400123456", "+447400123456", "+4915112345678"]
+    assert combined["Phone_Country"].tolist() == ["United Kingdom", "Germany", "Germany", "India"]
+    assert combined["Phone_Number"].isna().tolist() == [False, False, False, True]
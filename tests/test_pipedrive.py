@@ -0,0 +1,76 @@
+"""Pipedrive persons: value picking as in the notebook export, and the incremental sync against a fake API."""
+import json
+
+from account_workflow.pipedrive import pick_email, pick_phone, sync_persons
+from conftest import send
+
+UK_MOBILE = "+447400123456"
+DE_MOBILE = "+4915112345678"
+
+
+def person(id, update_time, email=None, phones=(), name="P"):
+    return {"id": id, "name": name, "first_name": name, "last_name": None, "update_time": update_time,
+            "emails": [{"value": email, "primary": True}] if email else [], "phones": list(phones)}
+
+
+def test_pick_phone_skips_invalid_numbers():
+    phones = [
+        {"value": "+", "primary": True},
+        {"value": "123", "primary": False},
+        {"value": "+44 7700 900123", "primary": False},  # well-formed but not a valid number
+        {"value": DE_MOBILE, "primary": False},
+    ]
+    assert pick_phone({"phones": phones}) == DE_MOBILE
+
+
+def test_pick_phone_prefers_valid_primary():
+    phones = [{"value": DE_MOBILE, "primary": False}, {"value": "+44 7400 123456", "primary": True}]
+    assert pick_phone({"phones": phones}) == UK_MOBILE
+    phones = [{"value": DE_MOBILE, "primary": False}, {"value": "12", "primary": True}]
+    assert pick_phone({"phones": phones}) == DE_MOBILE
+    assert pick_phone({"phones": [{"value": "42", "primary": True}]}) is None
+
+
+def test_pick_email():
+    emails = [{"value": "not-an-email", "primary": True}, {"value": " b@x.com ", "primary": False}]
+    assert pick_email({"emails": emails}) == "b@x.com"
+
+
+def test_sync_persons_pages_retries_and_upserts(tmp_path, fake_api):
+    first_sync = [
+        [person(1, "2025-08-01T10:00:00Z", "a@x.com", [{"value": UK_MOBILE, "primary": True}]),
+         person(2, "2025-08-02T10:00:00Z", "b@x.com", [{"value": "+", "primary": True}])],
+        [person(3, "2025-08-03T10:00:00Z")],
+    ]
+    second_sync = [[person(1, "2025-08-05T10:00:00Z", "a2@x.com", [{"value": DE_MOBILE, "primary": True}])]]
+    limited = []
+
+    def respond(handler, path, query):
+        pages = second_sync if "updated_since" in query else first_sync
+        if len(limited) < 1:
+            limited.append(query)
+            send(handler, 429, b"{}", {"Retry-After": "0"})
+            return
+        page = int(query.get("cursor", 0))
+        next_cursor = str(page + 1) if page + 1 < len(pages) else None
+        body = {"success": True, "data": pages[page], "additional_data": {"next_cursor": next_cursor}}
+        send(handler, 200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+
+    fake_api.respond = respond
+    url = fake_api.url + "/api/v2/persons"
+    synced = sync_persons(tmp_path, "token", url=url)
+    assert synced["fetched"] == 3 and synced["total"] == 3
+    assert len(fake_api.requests) == 3  # the rate-limited request is retried, then two pages
+    contacts = synced["contacts"].set_index("Email")
+    assert contacts.loc["a@x.com", "Phone"] == UK_MOBILE
+    assert contacts.loc["a@x.com", "Phone_Country_Name"] == "United Kingdom"
+    assert contacts.loc["b@x.com"].isna()["Phone"]  # a bare "+" is not a phone
+    assert len(contacts) == 2  # person 3 has no email
+
+    fake_api.requests.clear()
+    synced = sync_persons(tmp_path, "token", url=url)
+    assert fake_api.requests[0][1]["updated_since"] == "2025-08-03T10:00:00Z"
+    assert synced["fetched"] == 1 and synced["total"] == 3
+    contacts = synced["contacts"].set_index("Email")
+    assert sorted(contacts.index) == ["a2@x.com", "b@x.com"]  # person 1 replaced, not duplicated
+    assert contacts.loc["a2@x.com", "Phone_Country_Name"] == "Germany"
@@ -0,0 +1,71 @@
+"""Tier snapshots on disk and the tier changes between runs."""
+from datetime import date
+
+import pandas as pd
+
+from account_workflow.tier_history import TierHistory, delta_summary, tier_delta, tier_snapshot
+
+
+def final(*rows):
+    return pd.DataFrame(rows, columns=["Email", "Tier", "Amount_per_month"])
+
+
+RUN_1 = final(
+    ("a@x.com", "Gold", 100.0),
+    ("b@x.com", "VIP", 50.0),
+    ("c@x.com", "Silver", 70.0),
+    ("d@x.com", "Bronze", 10.0),
+    (None, "Bronze", 0.0),  # no email: not tracked
+)
+RUN_2 = final(
+    ("a@x.com", "Platinum", 150.0),  # up
+    ("b@x.com", "Silver", 40.0),  # down
+    ("c@x.com", "Silver", 75.0),  # same tier, amount changed
+    ("e@x.com", "Bronze", 5.0),  # new
+    ("e@x.com", "Gold", 99.0),  # duplicate email: the first row counts
+)
+
+
+def test_tier_delta():
+    delta = tier_delta(tier_snapshot(RUN_1), tier_snapshot(RUN_2)).set_index("Email")
+    assert delta["Change"].to_dict() == {
+        "a@x.com": "Upgrade", "b@x.com": "Downgrade", "d@x.com": "Churned", "e@x.com": "New",
+    }
+    assert delta.loc["a@x.com", ["Previous_Tier", "Tier"]].tolist() == ["Gold", "Platinum"]
+    assert pd.isna(delta.loc["e@x.com", "Previous_Tier"]) and delta.loc["e@x.com", "Tier"] == "Bronze"
+    assert pd.isna(delta.loc["d@x.com", "Tier"]) and delta.loc["d@x.com", "Previous_Amount_per_month"] == 10.0
+
+    summary = delta_summary(delta.reset_index())
+    assert summary["Number_of_Users"].sum() == 4
+
+
+def test_record_run(tmp_path):
+    history = TierHistory(tmp_path)
+    assert history.record_run(RUN_1, date(2025, 8, 30)) == (None, None)
+    # a later run on the same day replaces that day's snapshot
+    history.record_run(RUN_1.assign(Tier="Bronze"), date(2025, 8, 31))
+    previous_day, first = history.record_run(RUN_1, date(2025, 8, 31))
+    assert previous_day == date(2025, 8, 30)
+    assert first.empty
+
+    previous_day, delta = history.record_run(RUN_2, date(2025, 9, 2))
+    assert previous_day == date(2025, 8, 31)
+    assert sorted(delta["Change"].astype(str)) == ["Churned", "Downgrade", "New", "Upgrade"]
+    assert history.snapshot_dates() == [date(2025, 8, 30), date(2025, 8, 31), date(2025, 9, 2)]
+    assert history.snapshot_path(date(2025, 9, 2)).parent.name == "2025-09"
+    pd.testing.assert_frame_equal(history.delta(date(2025, 8, 31), date(2025, 9, 2)), delta)
+
+
+def test_timeline_filters_dates_and_emails(tmp_path):
+    history = TierHistory(tmp_path)
+    history.record(RUN_1, date(2025, 8, 31))
+    history.record(RUN_2, date(2025, 9, 2))
+    history.record(RUN_2, date(2025, 10, 1))
+
+    timeline = history.timeline(to_date=date(2025, 9, 30), emails=["a@x.com", "e@x.com"])
+    assert timeline[["Email", "Tier"]].astype(str).values.tolist() == [
+        ["a@x.com", "Gold"], ["a@x.com", "Platinum"], ["e@x.com", "Bronze"],
+    ]
+    assert timeline["Snapshot_Date"].tolist() == [pd.Timestamp("2025-08-31")] + [pd.Timestamp("2025-09-02")] * 2
+    assert history.load(date(2025, 10, 1), ["nobody@x.com"]).empty
+    assert history.timeline(from_date=date(2026, 1, 1)).empty
@@ -0,0 +1,101 @@
+"""Vectorized tier rules give the tiers of the row-wise assign_tier they replaced."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from account_workflow.tiers import (
+    TIER_ORDER,
+    TIER_RULES,
+    assign_tiers,
+    compare_rule_sets,
+    read_rule_sets,
+    tier_distribution,
+)
+
+
+def original_tier(duration, amount):
+    """app.py's assign_tier."""
+    if duration >= 24 and amount >= 30:
+        return 'VIP'
+    if (duration >= 12 and amount > 120) or \
+       (duration >= 6 and amount > 180) or \
+       (duration >= 3 and amount > 300):
+        return 'Platinum'
+    if (duration >= 6 and amount > 80) or \
+       (duration >= 3 and amount > 120):
+        return 'Gold'
+    if (duration >= 6 and amount >= 60) or \
+       (duration >= 3 and amount > 80):
+        return 'Silver'
+    return 'Bronze'
+
+
+def original_tier_coerced(row):
+    """app_copy.py's assign_tier, which coerced missing and non-numeric values first."""
+    duration = row.get('Duration_Months', 0) or 0
+    amount = row.get('Amount_per_month', 0) or 0
+    try:
+        duration = int(duration)
+    except (TypeError, ValueError):
+        duration = 0
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        amount = 0.0
+    return original_tier(duration, amount)
+
+
+def test_boundaries_match():
+    # every threshold, just below and just above it
+    durations = sorted({d + e for _, d, _, _ in TIER_RULES for e in (-1, 0, 1)} | {0})
+    amounts = sorted({a + e for _, _, _, a in TIER_RULES for e in (-0.01, 0, 0.01)} | {0})
+    grid = pd.DataFrame([(d, a) for d in durations for a in amounts], columns=['Duration_Months', 'Amount_per_month'])
+    expected = [original_tier(d, a) for d, a in grid.itertuples(index=False)]
+    assert assign_tiers(grid).tolist() == expected
+
+
+def test_random_values_match():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Duration_Months': rng.integers(0, 60, 5000),
+        'Amount_per_month': rng.choice([30, 60, 80, 120, 180, 300], 5000) + rng.choice([-0.5, 0, 0.5, 40], 5000),
+    })
+    expected = [original_tier(d, a) for d, a in df.itertuples(index=False)]
+    assert assign_tiers(df).tolist() == expected
+
+
+def test_missing_and_non_numeric_values_match_app_copy():
+    df = pd.DataFrame({
+        'Duration_Months': [np.nan, None, 'abc', '30', 30, 30.7, 24, 7, 0],
+        'Amount_per_month': [500, 500, 500, '45.5', np.nan, None, 'n/a', '200', ''],
+    }, dtype=object)
+    expected = [original_tier_coerced(row) for _, row in df.iterrows()]
+    assert assign_tiers(df).tolist() == expected
+    assert expected == ['Bronze', 'Bronze', 'Bronze', 'VIP', 'Bronze', 'Bronze', 'Bronze', 'Platinum', 'Bronze']
+
+
+def test_compare_rule_sets_scores_each_set():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'Duration_Months': rng.integers(0, 40, 500), 'Amount_per_month': rng.gamma(2, 50, 500)})
+    strict = [('VIP', 36, '>=', 50)] + TIER_RULES[1:]
+    loose = [('VIP', 12, '>=', 20), ('Gold', 1, '>', 0)]
+    scored = compare_rule_sets(df, {'current': TIER_RULES, 'strict': strict, 'loose': loose})
+    for name, rules in [('current', TIER_RULES), ('strict', strict), ('loose', loose)]:
+        assert scored[name].tolist() == assign_tiers(df, rules).tolist()
+
+    counts = tier_distribution(scored)
+    assert counts.index.tolist() == TIER_ORDER
+    assert (counts.sum() == len(df)).all()
+    assert counts.loc['Platinum', 'loose'] == 0
+
+
+def test_read_rule_sets(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'strict': [['VIP', 36, '>=', 50], ['Gold', 6, '>', 80]]}))
+    assert read_rule_sets(path) == {'strict': [('VIP', 36, '>=', 50), ('Gold', 6, '>', 80)]}
+
+    path.write_text(json.dumps({'bad': [['VIP', 36, '<', 50]]}))
+    with pytest.raises(ValueError, match="bad"):
+        read_rule_sets(path)
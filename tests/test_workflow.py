@@ -0,0 +1,36 @@
+"""The background workflow computes every date-dependent value from its ``today`` parameter."""
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from account_workflow import workflow
+from account_workflow.mixpanel import PAYMENT_EVENT
+from account_workflow.workflow import WorkflowParams, run_mixpanel_workflow
+
+PAYMENT_MIXPANEL_CSV = b"Email,Workspace,A. Payment (all time),B. Amount (Year),C. Amount (Month)\na@x.com,W,1200,1200,100\n"
+PIPEDRIVE_CSV = b"email,full_name,first_name,last_name,phone,phone_country_name\na@x.com,A B,A,B,+447400123456,United Kingdom\n"
+
+
+def noon(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc).timestamp())
+
+
+def test_workflow_uses_params_today(monkeypatch, tmp_path):
+    todays = []
+
+    def fake_fetch_events(event_name, properties, from_date, to_date, *, today=None, **kwargs):
+        todays.append(today)
+        rows = [{"time": noon(date(2024, 1, 10)), "$email": "a@x.com"}] if event_name == PAYMENT_EVENT else []
+        return pd.DataFrame(rows, columns=properties).assign(event=event_name), None
+
+    monkeypatch.setattr(workflow, "fetch_events", fake_fetch_events)
+    monkeypatch.setattr(workflow, "PAYMENT_STATE_DIR", str(tmp_path / "payment_state"))
+    params = WorkflowParams(from_date=date(2024, 1, 1), to_date=date(2024, 1, 31), use_event_store=False,
+                            record_history=False, today=date(2025, 1, 20))
+    result = run_mixpanel_workflow(params, PAYMENT_MIXPANEL_CSV, PIPEDRIVE_CSV,
+                                   {"MIXPANEL_API_KEY": "k", "MIXPANEL_PROJECT_ID": "1"})
+
+    assert todays == [params.today, params.today]
+    # 2024-01-10 .. 2025-01-20 is 12 months and 10 days, rounded up; not counted to the current date
+    assert result["pay1"]["Duration_Months"].tolist() == [13]
+    assert result["final_merged"]["Duration_Months"].tolist() == [13]